@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compares the InnoDB status parsers on the test fixtures, inflated with a
+configurable number of open transactions to mimic a busy server::
+
+    $ python benchmarks/innodb_parser.py --transactions 5000
+
+The table parser reuses the metrics of sections that didn't change since
+the previous poll, its cache is cleared before every parse to compare the
+parsers themselves. The polls of a quiet server, only changing the
+timestamp line, are timed separately.
+"""
+import argparse
+import itertools
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mysql_statsd.preprocessors import InnoDBPreprocessor, InnoDBTablePreprocessor
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures')
+
+TRANSACTION = """---TRANSACTION {0}, ACTIVE {1} sec starting index read
+mysql tables in use 1, locked 1
+LOCK WAIT 2 lock struct(s), heap size 360, 1 row lock(s)
+MySQL thread id {0}, OS thread handle 0x7fc0eba7c700, query id {0} localhost app updating
+UPDATE accounts SET balance = balance - 1 WHERE id = {0}
+RECORD LOCKS space id 0 page no 307 n bits 72 index `PRIMARY` of table `app`.`accounts` trx id {0} lock_mode X locks rec but not gap waiting
+Record lock, heap no 2 PHYSICAL RECORD: n_fields 4; compact format; info bits 0
+ 0: len 4; hex 80000001; asc     ;;
+ 1: len 6; hex 000000000502; asc       ;;
+ 2: len 7; hex 83000001360110; asc     6  ;;
+ 3: len 4; hex 80000002; asc     ;;
+"""
+
+
+def inflate(status, transactions):
+    """Adds transactions to the TRANSACTIONS section of a status blob"""
+    marker = 'LIST OF TRANSACTIONS FOR EACH SESSION:\n'
+    extra = ''.join(TRANSACTION.format(i, i % 60) for i in range(transactions))
+    return status.replace(marker, marker + extra)
+
+
+def polls(status):
+    """Endless polls of the same status, every one with a new timestamp line"""
+    header = status.split('\n')[1]
+    for second in itertools.cycle(range(60)):
+        yield [('InnoDB', '', status.replace(header, '150221 12:35:{0:02d} INNODB MONITOR OUTPUT'.format(second), 1))]
+
+
+def bench(parse, number):
+    return min(timeit.repeat(parse, repeat=3, number=number)) / number
+
+
+def main():
+    op = argparse.ArgumentParser()
+    op.add_argument("--transactions", type=int, default=2000,
+            help="Number of open transactions to add to the fixtures")
+    op.add_argument("--number", type=int, default=20,
+            help="Number of parses per measurement")
+    opt = op.parse_args()
+
+    for fixture in sorted(os.listdir(FIXTURES)):
+        if not fixture.startswith('show-innodb-status'):
+            continue
+        status = inflate(open(os.path.join(FIXTURES, fixture), 'rb').read(), opt.transactions)
+        rows = [('InnoDB', '', status)]
+
+        legacy, table = InnoDBPreprocessor(), InnoDBTablePreprocessor()
+        if dict(legacy.process(rows)) != dict(table.process(rows)):
+            sys.exit("Parsers disagree on {0}".format(fixture))
+
+        def parse_uncached():
+            table.section_cache.clear()
+            table.process(rows)
+
+        legacy_time = bench(lambda: legacy.process(rows), opt.number)
+        table_time = bench(parse_uncached, opt.number)
+        print("{0} ({1} bytes): legacy {2:.2f}ms, table {3:.2f}ms, {4:.1f}x faster".format(
+            fixture, len(status), legacy_time * 1000, table_time * 1000, legacy_time / table_time))
+
+        quiet = polls(status)
+        cached_time = bench(lambda: table.process(next(quiet)), opt.number)
+        print("{0}: table on unchanged sections, new timestamp {1:.2f}ms".format(fixture, cached_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
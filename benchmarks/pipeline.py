@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+End to end benchmark of the MySQL poller -> queue -> statsd sender pipeline.
+
+Runs entirely offline: the pollers get fake connections returning recorded
+SHOW GLOBAL STATUS, SHOW GLOBAL VARIABLES, SHOW SLAVE STATUS and SHOW ENGINE
+INNODB STATUS results and metrics are sent to a local UDP sink::
+
+    $ python benchmarks/pipeline.py --duration 10 --interval-scale 0.1 --batch
+
+The checks and whitelist are read from the config file, their intervals are
+multiplied by --interval-scale to put the pipeline under more pressure.
+"""
+import argparse
+import fnmatch
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from ConfigParser import ConfigParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.thread_mysql import ThreadMySQL
+from mysql_statsd.thread_mysql_evented import ThreadMySQLEvented
+from mysql_statsd.thread_statsd import ThreadStatsd
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(BASE, 'fixtures')
+DEFAULT_CONFIG = os.path.join(BASE, '..', 'docs', 'mysql-statsd.conf')
+INNODB_FIXTURE = os.path.join(BASE, '..', 'tests', 'fixtures', 'show-innodb-status-5.5-vanilla')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return [line.rstrip('\n').split('\t') for line in f]
+
+
+class FakeCursor(object):
+    """Returns recorded results, counters grow on every execute so deltas get sent"""
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rows = ()
+
+    def execute(self, query):
+        self.connection.executed += 1
+        results = self.connection.results
+        query = query.upper()
+        for prefix in results:
+            if query.startswith(prefix):
+                self.description, rows = results[prefix]
+                break
+        else:
+            self.description, rows = (), ()
+
+        if query.startswith('SHOW GLOBAL STATUS'):
+            step = self.connection.executed
+            rows = tuple((name, str(int(value) + step)) for name, value in rows)
+        if ' WHERE ' in query:
+            rows = self.where(query, rows)
+        self.rows = rows
+
+    @staticmethod
+    def where(query, rows):
+        """ Applies the Variable_name IN (...) and LIKE conditions of narrowed queries """
+        names = set(re.findall(r"'([^']*)'", query.split(' LIKE ')[0]))
+        patterns = [like.replace('%', '*') for like in re.findall(r"LIKE '([^']*)'", query)]
+        return tuple(row for row in rows if row[0].upper() in names or
+                     any(fnmatch.fnmatch(row[0].upper(), pattern) for pattern in patterns))
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection(object):
+    open = True
+
+    def __init__(self):
+        self.executed = 0
+        name_value = (('Variable_name',), ('Value',))
+        slave = read_fixture('show-slave-status')
+        self.results = {
+            'SHOW GLOBAL STATUS': (name_value, tuple(tuple(row) for row in read_fixture('show-global-status'))),
+            'SHOW GLOBAL VARIABLES': (name_value, tuple(tuple(row) for row in read_fixture('show-global-variables'))),
+            'SHOW SLAVE STATUS': (tuple((column,) for column in slave[0]), (tuple(slave[1]),)),
+            'SHOW ENGINE INNODB STATUS': ((('Type',), ('Name',), ('Status',)),
+                                          (('InnoDB', '', open(INNODB_FIXTURE).read()),)),
+        }
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.open = False
+
+
+class Stats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.check_started = {}
+        self.check_runs = {}
+        self.parse_time = {}
+        self.latencies = []
+        self.datagrams = 0
+        self.metrics = 0
+
+
+class UDPSink(threading.Thread):
+    """Counts the datagrams and metrics it receives and their latency"""
+    def __init__(self, stats, prefix):
+        threading.Thread.__init__(self)
+        self.stats = stats
+        self.prefix = prefix + '.'
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.is_running = True
+
+    def run(self):
+        while self.is_running:
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            received = time.time()
+            self.stats.datagrams += 1
+            for line in data.split('\n'):
+                self.stats.metrics += 1
+                check_type = line[len(self.prefix):].split('.', 1)[0]
+                started = self.stats.check_started.get(check_type)
+                if started:
+                    self.stats.latencies.append(received - started)
+
+    def stop(self):
+        self.is_running = False
+
+
+def instrument(poller, stats):
+    """Records check start times and parse time per check type"""
+    fetch, preprocess = poller.fetch, poller._preprocess
+
+    def timed_fetch(check_type):
+        stats.check_started[check_type] = time.time()
+        with stats.lock:
+            stats.check_runs[check_type] = stats.check_runs.get(check_type, 0) + 1
+        return fetch(check_type)
+
+    def timed_preprocess(check_type, column_names, rows):
+        start = time.time()
+        result = preprocess(check_type, column_names, rows)
+        with stats.lock:
+            stats.parse_time.setdefault(check_type, []).append(time.time() - start)
+        return result
+
+    poller.fetch = timed_fetch
+    poller._preprocess = timed_preprocess
+    poller.connection = FakeConnection()
+
+
+def get_config(config_file, interval_scale):
+    cnf = ConfigParser()
+    cnf.read(config_file)
+    mysql = dict(cnf.items('mysql'))
+    for key in mysql:
+        if key.startswith('interval_'):
+            mysql[key] = str(int(int(mysql[key]) * interval_scale))
+    mysql['sleep_interval'] = str(int(int(mysql.get('sleep_interval', 500)) * interval_scale))
+    return dict(mysql=mysql, metrics=dict(cnf.items('metrics')))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    op = argparse.ArgumentParser()
+    op.add_argument("-c", "--config", default=DEFAULT_CONFIG,
+            help="Configuration file to take the checks and metrics from")
+    op.add_argument("--duration", type=float, default=10,
+            help="Seconds to run the pipeline")
+    op.add_argument("--interval-scale", type=float, default=0.1,
+            help="Multiply all check intervals by this factor")
+    op.add_argument("--engine", default="thread", choices=["thread", "event"],
+            help="Collection engine to benchmark")
+    op.add_argument("--batch", default=False, action="store_true",
+            help="Batch metrics into as few packets as possible")
+    opt = op.parse_args()
+
+    stats = Stats()
+    queue = MetricQueue()
+    config = get_config(opt.config, opt.interval_scale)
+
+    sink = UDPSink(stats, 'bench')
+    statsd_thread = ThreadStatsd(queue=queue, host='127.0.0.1', port=sink.port, prefix='bench',
+                                 include_hostname='false', batch=str(opt.batch))
+
+    if opt.engine == 'event':
+        mysql_thread = ThreadMySQLEvented(queue=queue, instances=[config])
+        for poller, check_type in mysql_thread.checks:
+            instrument(poller, stats)
+    else:
+        mysql_thread = ThreadMySQL(queue=queue, **config)
+        instrument(mysql_thread, stats)
+
+    threads = [sink, statsd_thread, mysql_thread]
+    cpu_start, wall_start = sum(os.times()[:2]), time.time()
+    for thread in threads:
+        thread.start()
+    time.sleep(opt.duration)
+    for thread in reversed(threads):
+        thread.stop()
+        thread.join()
+    cpu, wall = sum(os.times()[:2]) - cpu_start, time.time() - wall_start
+
+    # A poll cycle is one run of the most frequent check
+    cycles = max(stats.check_runs.values() or [1])
+    print("Engine {0}, batching {1}, {2:.1f}s".format(opt.engine, 'on' if opt.batch else 'off', wall))
+    print("Metrics: {0} in {1} datagrams, {2:.0f} metrics/sec".format(
+        stats.metrics, stats.datagrams, stats.metrics / wall))
+    print("CPU: {0:.2f}s total, {1:.2f}ms per poll cycle ({2} cycles)".format(cpu, cpu * 1000 / cycles, cycles))
+    for check_type in sorted(stats.parse_time):
+        times = stats.parse_time[check_type]
+        print("Parse {0}: {1} runs, {2:.3f}ms mean, {3:.3f}ms max".format(
+            check_type, len(times), sum(times) * 1000 / len(times), max(times) * 1000))
+    print("Latency: {0:.2f}ms p50, {1:.2f}ms p99, {2:.2f}ms max".format(
+        percentile(stats.latencies, 0.5) * 1000, percentile(stats.latencies, 0.99) * 1000,
+        max(stats.latencies or [0]) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import cPickle as pickle
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+
+class CaptureWriter(object):
+    """
+    Appends raw check results to a capture file, for replaying them later
+    without a MySQL server. Every record is a 4 byte length followed by the
+    zlib compressed pickle of (timestamp, instance, check, column names, rows).
+    Pollers of many instances may share a writer.
+    """
+    magic = 'MYSQLSTATSD-CAPTURE-1\n'
+    header = struct.Struct('!L')
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'ab')
+        if os.path.getsize(path) == 0:
+            self.file.write(self.magic)
+        self.records = 0
+
+    def write(self, timestamp, instance, check_type, column_names, rows):
+        payload = zlib.compress(pickle.dumps((timestamp, instance, check_type, column_names, rows), 2), 1)
+        with self.lock:
+            self.file.write(self.header.pack(len(payload)) + payload)
+            # A crash loses at most the record being written
+            self.file.flush()
+            self.records += 1
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class CaptureReader(object):
+    """
+    Reads the records of a capture file in order. The file is memory mapped,
+    so only the pages of the records read are loaded. A record cut off by a
+    crash while recording ends the capture.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = ''
+        if self.data[:len(CaptureWriter.magic)] != CaptureWriter.magic:
+            self.close()
+            raise ValueError("{0} is not a capture file".format(path))
+
+    def __iter__(self):
+        header = CaptureWriter.header
+        offset = len(CaptureWriter.magic)
+        size = len(self.data)
+        while offset + header.size <= size:
+            length, = header.unpack_from(self.data, offset)
+            start = offset + header.size
+            if start + length > size:
+                return
+            yield pickle.loads(zlib.decompress(self.data[start:start + length]))
+            offset = start + length
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import math
+import random
+import time
+
+
+class CheckScheduler(object):
+    """
+    Keeps the checks of a poller in a heap ordered by their next due time.
+
+    When aligned, checks are due on multiples of their interval since the
+    epoch, so every daemon samples a check at the same wall clock moments.
+    On top of that every check gets a fixed random offset of up to jitter
+    seconds to spread the load on the MySQL servers and statsd over a fleet.
+    Runs that were missed because a check took too long are skipped.
+
+    The interval of a check can be stretched up to max_factor times its
+    configured interval while the server is under load, doubling on every
+    run, and is halved again on every run once it isn't. Stretched intervals
+    are multiples of the configured one, so aligned checks stay aligned.
+    """
+    def __init__(self, align=True, jitter=0, max_factor=1):
+        self.align = align
+        self.jitter = jitter
+        self.max_factor = max_factor
+        self.heap = []
+        self.sequence = itertools.count()
+        self.intervals = {}
+        self.offsets = {}
+        self.lateness = {}
+        self.factors = {}
+        # Original due time of the checks that were deferred
+        self.deferred = {}
+
+    def add(self, check, interval, now=None):
+        """ Schedule a check every interval seconds, starting after now """
+        if now is None:
+            now = time.time()
+        self.intervals[check] = interval
+        self.factors[check] = 1
+        self.offsets[check] = random.uniform(0, self.jitter) if self.jitter else 0
+        self.lateness[check] = {'runs': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0}
+
+        if self.align:
+            offset = self.offsets[check]
+            due = math.floor((now - offset) / interval) * interval + interval + offset
+        else:
+            due = now + interval + self.offsets[check]
+        self.push(check, due)
+
+    def push(self, check, due):
+        heapq.heappush(self.heap, (due, next(self.sequence), check))
+
+    def next_time(self):
+        """ Timestamp the first check is due at, None without checks """
+        if not self.heap:
+            return None
+        return self.heap[0][0]
+
+    def sleep_time(self, now, max_sleep=None):
+        """ Seconds until the first check is due, at most max_sleep """
+        next_time = self.next_time()
+        if next_time is None:
+            return max_sleep
+        remaining = max(0, next_time - now)
+        if max_sleep is not None:
+            return min(remaining, max_sleep)
+        return remaining
+
+    def pop_due(self, now):
+        """
+        Removes the first check if it is due and returns (check, due time),
+        returns None when nothing is due. The check has to be put back with
+        reschedule once it has run.
+        """
+        if not self.heap or self.heap[0][0] > now:
+            return None
+        due, sequence, check = heapq.heappop(self.heap)
+        return check, self.deferred.pop(check, due)
+
+    def defer(self, check, due, until):
+        """ Puts back a check that was due at due without running it, until then """
+        self.deferred[check] = due
+        self.push(check, until)
+
+    def interval(self, check):
+        """ Seconds between the runs of a check, stretched while under load """
+        return self.intervals[check] * self.factors[check]
+
+    def stretch(self, check, overloaded):
+        """
+        Doubles the interval of a check when overloaded, up to max_factor
+        times the configured interval, and halves it when not. Returns
+        whether the interval changed.
+        """
+        factor = self.factors[check]
+        if overloaded:
+            self.factors[check] = min(factor * 2, max(self.max_factor, 1))
+        else:
+            self.factors[check] = max(factor // 2, 1)
+        return self.factors[check] != factor
+
+    def reschedule(self, check, due, now):
+        """ Schedule the next run of a check that was due at due, after now """
+        interval = self.interval(check)
+        next_due = due + interval
+        if next_due <= now:
+            next_due += math.ceil((now - next_due) / interval) * interval
+            if next_due <= now:
+                next_due += interval
+        self.push(check, next_due)
+        return next_due
+
+    def keep(self, previous):
+        """
+        Takes over the due times, offsets, lateness and stretched intervals
+        of the checks whose interval didn't change from the scheduler
+        previous, used on reload.
+        Checks that were running (popped but not rescheduled) are left out,
+        reschedule puts them back once they've finished.
+        """
+        due_times = dict((check, due) for due, sequence, check in previous.heap)
+        heap = []
+        for due, sequence, check in self.heap:
+            if previous.intervals.get(check) == self.intervals[check]:
+                self.offsets[check] = previous.offsets[check]
+                self.lateness[check] = previous.lateness[check]
+                self.factors[check] = min(previous.factors[check], max(self.max_factor, 1))
+                if check in previous.deferred:
+                    self.deferred[check] = previous.deferred[check]
+                if check not in due_times:
+                    continue
+                due = due_times[check]
+            elif check in previous.intervals and check not in due_times:
+                continue
+            heap.append((due, sequence, check))
+        heapq.heapify(heap)
+        self.heap = heap
+
+    def record(self, check, due, started):
+        """ Keep track of how late a check started compared to its due time """
+        late = max(0.0, started - due)
+        lateness = self.lateness[check]
+        lateness['runs'] += 1
+        lateness['total'] += late
+        lateness['last'] = late
+        lateness['max'] = max(lateness['max'], late)
+        return late
+
+    def report(self):
+        lines = []
+        for check in sorted(self.lateness):
+            lateness = self.lateness[check]
+            mean = lateness['total'] / lateness['runs'] if lateness['runs'] else 0
+            lines.append("Check {0}: {1} runs, {2:.2f}ms mean lateness, {3:.2f}ms max".format(
+                check, lateness['runs'], mean * 1000, lateness['max'] * 1000))
+        return "\n".join(lines)
@@ -0,0 +1,103 @@
+import heapq
+import itertools
+import Queue
+import threading
+import time
+import traceback
+
+
+class EventLoopWorker(threading.Thread):
+    """ Runs blocking calls offloaded by the event loop """
+    def __init__(self, loop):
+        threading.Thread.__init__(self)
+        self.loop = loop
+
+    def run(self):
+        while True:
+            call = self.loop.offloaded.get()
+            # None is the signal to quit
+            if call is None:
+                return
+
+            func, args, callback = call
+            try:
+                result, error = func(*args), None
+            except Exception as ex:
+                result, error = None, ex
+                traceback.print_exc()
+            self.loop.completed.put((callback, result, error))
+
+
+class EventLoop(object):
+    """
+    Minimal single threaded event loop.
+    All callbacks (timers and completions of offloaded calls) run on the
+    thread calling run(), blocking calls are offloaded to a bounded set of
+    worker threads so a slow call never delays the other callbacks.
+    """
+    def __init__(self, workers=4):
+        self.timers = []
+        self.sequence = itertools.count()
+        self.offloaded = Queue.Queue()
+        self.completed = Queue.Queue()
+        self.workers = [EventLoopWorker(self) for i in range(workers)]
+        self.is_running = False
+
+    def call_at(self, when, callback, *args):
+        """ Run callback on the loop at timestamp when (in seconds) """
+        heapq.heappush(self.timers, (when, next(self.sequence), callback, args))
+
+    def call_later(self, delay, callback, *args):
+        self.call_at(time.time() + delay, callback, *args)
+
+    def call_threadsafe(self, callback, *args):
+        """ Run callback on the loop as soon as possible, may be called from any thread """
+        self.completed.put((lambda result, error: callback(*args), None, None))
+
+    def run_in_worker(self, func, args, callback):
+        """
+        Run func(*args) on a worker thread, callback(result, error) is then
+        run on the loop with either the result or the raised exception.
+        """
+        self.offloaded.put((func, args, callback))
+
+    def run_once(self, max_wait=1):
+        """ Wait for the next timer or completion and run everything that is ready """
+        timeout = max_wait
+        if self.timers:
+            timeout = max(0, min(max_wait, self.timers[0][0] - time.time()))
+
+        try:
+            callback, result, error = self.completed.get(True, timeout)
+            callback(result, error)
+            # Handle any other completions without waiting
+            while True:
+                callback, result, error = self.completed.get_nowait()
+                callback(result, error)
+        except Queue.Empty:
+            pass
+
+        now = time.time()
+        while self.timers and self.timers[0][0] <= now:
+            when, sequence, callback, args = heapq.heappop(self.timers)
+            callback(*args)
+
+    def run(self):
+        self.is_running = True
+        for worker in self.workers:
+            worker.start()
+
+        while self.is_running:
+            self.run_once()
+
+        # Drop offloaded calls that haven't started yet
+        try:
+            while True:
+                self.offloaded.get_nowait()
+        except Queue.Empty:
+            pass
+        for worker in self.workers:
+            self.offloaded.put(None)
+
+    def stop(self):
+        self.is_running = False
@@ -0,0 +1,123 @@
+import Queue
+import time
+
+
+class MetricQueue(Queue.Queue):
+    """
+    Queue between the MySQL pollers and the sender.
+    Every item is the result of one check: (timestamp, [(key, value, type), ...])
+    so a poll takes the lock once instead of once per metric.
+
+    At most max_size check results are kept (0 is unbounded), putting never
+    blocks the pollers. When the queue is full the policy decides what happens:
+    drop_oldest discards the oldest result, drop_newest the new one and
+    coalesce merges everything queued into one result: the latest value of
+    every gauge, delta and rate, the sum of every counter and raw value, and
+    every sample of a timer.
+
+    Queues added with tee() get every result put in this queue as well, so
+    more than one backend can consume the results of the pollers.
+    """
+    policies = ('drop_oldest', 'drop_newest', 'coalesce')
+    # Types whose values are increments, summed when coalescing
+    summed_types = ('c', 'r')
+    # Types of which every sample counts, kept when coalescing
+    kept_types = ('t',)
+
+    def __init__(self, max_size=0, policy='drop_oldest'):
+        if policy not in self.policies:
+            raise ValueError("Unknown queue policy {0}, use one of {1}".format(policy, ", ".join(self.policies)))
+        # The queue itself is unbounded so put() never blocks, _put enforces max_size
+        Queue.Queue.__init__(self)
+        self.max_size = max_size
+        self.policy = policy
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_water = 0
+        self.mirrors = []
+
+    def tee(self, queue):
+        """ Put every item put in this queue in queue as well """
+        self.mirrors.append(queue)
+
+    def put(self, item, block=True, timeout=None):
+        Queue.Queue.put(self, item, block, timeout)
+        for queue in self.mirrors:
+            queue.put(item, block, timeout)
+
+    def _put(self, item):
+        if self.max_size and len(self.queue) >= self.max_size:
+            self.overflow(item)
+        else:
+            self.queue.append(item)
+        if len(self.queue) > self.high_water:
+            self.high_water = len(self.queue)
+
+    def overflow(self, item):
+        """ Called with the mutex held when item doesn't fit anymore """
+        if self.policy == 'drop_newest':
+            self.dropped += len(item[1])
+        elif self.policy == 'drop_oldest':
+            self.dropped += len(self.queue.popleft()[1])
+            self.queue.append(item)
+        else:
+            self.queue.append(item)
+            self.coalesce()
+
+    def coalesce(self):
+        """ Merges all queued results into one, with the timestamp of the latest """
+        merged = {}
+        kept = []
+        count = 0
+        for timestamp, samples in self.queue:
+            count += len(samples)
+            for sample in samples:
+                key, value, metric_type = sample
+                if metric_type in self.kept_types:
+                    kept.append(sample)
+                    continue
+                previous = merged.get(key)
+                if previous is not None and metric_type in self.summed_types:
+                    try:
+                        sample = (key, float(previous[1]) + float(value), metric_type)
+                    except (TypeError, ValueError):
+                        pass
+                merged[key] = sample
+        samples = merged.values() + kept
+        self.coalesced += count - len(samples)
+        self.queue.clear()
+        self.queue.append((timestamp, samples))
+
+    def reset_high_water(self):
+        """ Returns the most items queued at once since the previous call """
+        with self.mutex:
+            high_water, self.high_water = self.high_water, len(self.queue)
+        return high_water
+
+    def get_all(self, block=True, timeout=None):
+        """
+        Remove and return all queued items at once. Waits for an item to
+        arrive just like get() does and raises Queue.Empty on timeout.
+        """
+        self.not_empty.acquire()
+        try:
+            if not block:
+                if not self._qsize():
+                    raise Queue.Empty
+            elif timeout is None:
+                while not self._qsize():
+                    self.not_empty.wait()
+            else:
+                endtime = time.time() + timeout
+                while not self._qsize():
+                    remaining = endtime - time.time()
+                    if remaining <= 0.0:
+                        raise Queue.Empty
+                    self.not_empty.wait(remaining)
+
+            items = list(self.queue)
+            self.queue.clear()
+            self.not_full.notify_all()
+            return items
+        finally:
+            self.not_empty.release()
@@ -0,0 +1,111 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NAN = float('nan')
+
+
+class MetricRegistry(object):
+    """
+    Keeps the previous value and timestamp of every tracked metric.
+
+    Each metric key gets a stable integer slot in contiguous arrays, NumPy
+    arrays when NumPy is installed and array.array otherwise, so the deltas
+    and per second rates of a whole poll are computed in one go.
+    Slots that haven't seen a value yet hold NaN.
+    """
+    def __init__(self, capacity=1024):
+        self.slots = {}
+        self.capacity = capacity
+        self.values = self.allocate(capacity)
+        self.timestamps = self.allocate(capacity)
+
+    @staticmethod
+    def allocate(size):
+        if numpy is not None:
+            return numpy.full(size, NAN)
+        return array('d', [NAN]) * size
+
+    def grow(self, size):
+        while self.capacity < size:
+            self.capacity *= 2
+        for name in ('values', 'timestamps'):
+            current = getattr(self, name)
+            grown = self.allocate(self.capacity)
+            grown[:len(current)] = current
+            setattr(self, name, grown)
+
+    def slot(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.slots)
+            if slot >= self.capacity:
+                self.grow(slot + 1)
+        return slot
+
+    def update(self, keys, values, timestamp):
+        """
+        Stores the new values of the keys measured at timestamp (in seconds).
+        Returns the deltas and per second rates against the previous values,
+        both NaN for keys that are seen for the first time.
+        """
+        slots = [self.slot(key) for key in keys]
+        if numpy is not None:
+            return self._update_numpy(slots, values, timestamp)
+
+        deltas, rates = [], []
+        for slot, value in zip(slots, values):
+            delta = value - self.values[slot]
+            elapsed = timestamp - self.timestamps[slot]
+            deltas.append(delta)
+            rates.append(delta / elapsed if elapsed > 0 else NAN)
+            self.values[slot] = value
+            self.timestamps[slot] = timestamp
+        return deltas, rates
+
+    def _update_numpy(self, slots, values, timestamp):
+        slots = numpy.array(slots, dtype=numpy.intp)
+        values = numpy.array(values, dtype=numpy.float64)
+
+        deltas = values - self.values[slots]
+        elapsed = timestamp - self.timestamps[slots]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            rates = numpy.where(elapsed > 0, deltas / elapsed, NAN)
+
+        self.values[slots] = values
+        self.timestamps[slots] = timestamp
+        return deltas.tolist(), rates.tolist()
+
+    def changed(self, keys, values, timestamp, heartbeat):
+        """
+        Returns for every key whether its value differs from the stored one or
+        the stored one is at least heartbeat seconds old. Only the values of
+        the keys that changed are stored.
+        """
+        slots = [self.slot(key) for key in keys]
+        if numpy is not None:
+            return self._changed_numpy(slots, values, timestamp, heartbeat)
+
+        changed = []
+        for slot, value in zip(slots, values):
+            # New keys hold NaN, which differs from any value
+            is_changed = value != self.values[slot] or timestamp - self.timestamps[slot] >= heartbeat
+            if is_changed:
+                self.values[slot] = value
+                self.timestamps[slot] = timestamp
+            changed.append(is_changed)
+        return changed
+
+    def _changed_numpy(self, slots, values, timestamp, heartbeat):
+        slots = numpy.array(slots, dtype=numpy.intp)
+        values = numpy.array(values, dtype=numpy.float64)
+
+        with numpy.errstate(invalid='ignore'):
+            changed = (values != self.values[slots]) | (timestamp - self.timestamps[slots] >= heartbeat)
+
+        self.values[slots[changed]] = values[changed]
+        self.timestamps[slots[changed]] = timestamp
+        return changed.tolist()
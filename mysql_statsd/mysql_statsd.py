@@ -2,17 +2,27 @@
 # -*- coding: utf-8 -*-
 
 import argparse
-import Queue
+import distutils.util
 import signal
 import sys
 import os
 import threading
 import time
+import traceback
+import zlib
 from ConfigParser import ConfigParser
 
+from capture import CaptureWriter
+from metric_queue import MetricQueue
+from process_supervisor import ProcessSupervisor
 from thread_manager import ThreadManager
 from thread_mysql import ThreadMySQL
+from thread_mysql_pool import ThreadMySQLPool
+from thread_mysql_evented import ThreadMySQLEvented
+from thread_replay import ThreadReplay
 from thread_statsd import ThreadStatsd, ThreadFakeStatsd
+from thread_prometheus import ThreadPrometheus
+from thread_graphite import ThreadGraphite
 
 
 class MysqlStatsd():
@@ -37,6 +47,22 @@ class MysqlStatsd():
                 help="Print the output that would be sent to statsd without actually sending data somewhere"
         )
 
+        op.add_argument("--engine", dest="engine",
+                default="thread", choices=["thread", "event"],
+                help="Poll MySQL with threads (default) or run all checks on a single event loop"
+        )
+
+        op.add_argument("--record", dest="record", metavar="FILE",
+                help="Append the raw result of every check to a capture file"
+        )
+        op.add_argument("--replay", dest="replay", metavar="FILE",
+                help="Send the check results of a capture file instead of polling MySQL"
+        )
+        op.add_argument("--realtime", dest="realtime",
+                default=False, action="store_true",
+                help="Replay check results as far apart as they were recorded instead of at full speed"
+        )
+
         # TODO switch the default to True, and make it fork by default in init script.
         op.add_argument("-f", "--foreground", dest="foreground", help="Dont fork main program", default=False, action="store_true")
 
@@ -55,31 +81,72 @@ class MysqlStatsd():
         if not opt.foreground:
             self.daemonize(stdin='/dev/null', stdout=logfile, stderr=logfile)
 
-        # Set up queue
-        self.queue = Queue.Queue()
+        self.opt = opt
+        instances = self.get_instances()
+        processes = int(self.config.get('daemon', {}).get('processes', 1))
+        if processes > 1 and len(instances) > 1 and not opt.replay:
+            # Spread the instances over worker processes to use more cores
+            self.shard_count = min(processes, len(instances))
+            supervisor = ProcessSupervisor(self.get_shards(), self.run_threads, reload=self.reload_shards)
+            supervisor.run()
+        else:
+            self.shard_count = 1
+            self.run_threads(0, instances)
+
+    def run_threads(self, worker, instances):
+        """ Poll the instances (or the [mysql] section) and send their metrics """
+        opt = self.opt
+        self.worker = worker
+        # Set up queue, bounded so a stalled sender can't take all memory
+        self.queue = self.make_queue()
 
-        # split off config for each thread
-        mysql_config = dict(mysql=self.config['mysql'])
-        mysql_config['metrics'] = self.config['metrics']
+        self.recorder = None
+        if opt.record:
+            # Every worker process records to its own file
+            self.recorder = CaptureWriter(opt.record + ('.{0}'.format(worker) if self.shard_count > 1 else ''))
 
-        statsd_config = self.config['statsd']
+        mysql_class, mysql_config = self.get_mysql_config(instances)
+        mysql_thread = mysql_class(queue=self.queue, **mysql_config)
+        self.mysql_thread = mysql_thread
 
-        # Spawn MySQL polling thread
-        mysql_thread = ThreadMySQL(queue=self.queue, **mysql_config)
-        # t1 = ThreadMySQL(config=self.config, queue=self.queue)
+        threads = [mysql_thread]
+        senders = []
 
         # Spawn Statsd flushing thread
-        statsd_thread = ThreadStatsd(queue=self.queue, **statsd_config)
+        statsd_config = self.get_statsd_config()
+        if opt.dry_run or distutils.util.strtobool(statsd_config.get('enabled', 'true')):
+            statsd_thread = ThreadStatsd(queue=self.queue, **statsd_config)
 
-        if opt.dry_run:
-            statsd_thread = ThreadFakeStatsd(queue=self.queue, **statsd_config)
+            if opt.dry_run:
+                statsd_thread = ThreadFakeStatsd(queue=self.queue, **statsd_config)
 
-        if opt.debug:
-            """ All debug settings go here """
-            statsd_thread.debug = True
+            if opt.debug:
+                """ All debug settings go here """
+                statsd_thread.debug = True
+
+            senders.append(statsd_thread)
+
+        # Spawn Graphite sender, it gets its own copy of the metrics when statsd is used too
+        graphite_config = self.config.get('graphite', {})
+        if not opt.dry_run and distutils.util.strtobool(graphite_config.get('enabled', 'false')):
+            graphite_queue = self.queue
+            if senders:
+                graphite_queue = self.make_queue()
+                self.queue.tee(graphite_queue)
+            senders.append(ThreadGraphite(queue=graphite_queue, **graphite_config))
+
+        threads.extend(senders)
+
+        # Serve the same metrics to Prometheus, only their latest values matter
+        prometheus_config = self.get_prometheus_config()
+        if distutils.util.strtobool(prometheus_config.get('enabled', 'false')):
+            prometheus_queue = MetricQueue(max_size=1, policy='coalesce')
+            self.queue.tee(prometheus_queue)
+            threads.append(ThreadPrometheus(queue=prometheus_queue, **prometheus_config))
+        self.threads = threads
 
         # Get thread manager
-        tm = ThreadManager(threads=[mysql_thread, statsd_thread])
+        tm = ThreadManager(threads=threads, reload=self.reload)
 
         try:
             tm.run()
@@ -92,6 +159,123 @@ class MysqlStatsd():
                 pass
 
             raise
+        finally:
+            if self.recorder is not None:
+                self.recorder.close()
+                print("Recorded {0} check results to {1}".format(self.recorder.records, self.recorder.path))
+
+    def get_mysql_config(self, instances):
+        """
+        Returns the class and config of the MySQL poller for the engine and
+        instances. Worker processes always poll instances, even when their
+        shard is empty, so a reload can add some.
+        """
+        instances = [dict(instance, recorder=self.recorder) for instance in instances]
+        sharded = self.shard_count > 1
+        if self.opt.replay:
+            # Only the whitelist and preprocessing of the instances are used
+            return ThreadReplay, dict(
+                path=self.opt.replay,
+                realtime=self.opt.realtime,
+                instances=instances or [dict(mysql=self.config['mysql'], metrics=self.config['metrics'])]
+            )
+        if self.opt.engine == 'event':
+            # One event loop running all checks of all instances
+            if not instances and not sharded:
+                instances = [dict(mysql=self.config['mysql'], metrics=self.config['metrics'], recorder=self.recorder)]
+            return ThreadMySQLEvented, dict(
+                instances=instances,
+                pool_size=self.config.get('mysql', {}).get('pool_size', 4)
+            )
+        elif instances or sharded:
+            # One poller servicing all configured [mysql:<name>] instances
+            return ThreadMySQLPool, dict(
+                instances=instances,
+                pool_size=self.config.get('mysql', {}).get('pool_size', 4),
+                sleep_interval=self.config.get('mysql', {}).get('sleep_interval', 500)
+            )
+        # MySQL polling thread
+        return ThreadMySQL, dict(mysql=self.config['mysql'], metrics=self.config['metrics'], recorder=self.recorder)
+
+    def get_statsd_config(self):
+        statsd_config = dict(self.config['statsd'])
+        if 'collector_prefix' in self.config.get('mysql', {}):
+            statsd_config.setdefault('collector_prefix', self.config['mysql']['collector_prefix'])
+        return statsd_config
+
+    def get_prometheus_config(self):
+        prometheus_config = dict(self.config.get('prometheus', {}))
+        # Every worker process listens on its own port
+        prometheus_config['port'] = int(prometheus_config.get('port', 9104)) + self.worker
+        # The prefixes of the instances become labels
+        prometheus_config['instances'] = [(instance['mysql']['prefix'], instance['mysql']['name'])
+                                          for instance in self.get_instances() if instance['mysql']['prefix']]
+        return prometheus_config
+
+    def get_shards(self):
+        """
+        Spreads the instances over the worker processes by a hash of their
+        name, so adding or removing an instance on reload doesn't move any
+        other instance to another worker.
+        """
+        shards = [[] for i in range(self.shard_count)]
+        for instance in self.get_instances():
+            shards[(zlib.crc32(instance['mysql']['name']) & 0xffffffff) % self.shard_count].append(instance)
+        return shards
+
+    def read_config(self):
+        """ Re-reads the config file, the current config is kept when that fails """
+        config = self.config
+        try:
+            self.get_config(self.opt.cfile)
+        except Exception as ex:
+            print("Reading {0} failed: {1!r}".format(self.opt.cfile, ex))
+            self.config = None
+        if not self.config:
+            print("Keeping the current config")
+            self.config = config
+            return False
+        return True
+
+    def reload_shards(self):
+        """ Re-reads the config in the supervisor, for workers started from now on """
+        if not self.read_config():
+            return None
+        return self.get_shards()
+
+    def reload(self):
+        """
+        Re-reads the config on SIGHUP and hands it to the running threads,
+        which apply it themselves so connections and delta state are kept.
+        Which threads run and the number of worker processes only change on
+        restart.
+        """
+        if not self.read_config():
+            return
+        try:
+            instances = self.get_shards()[self.worker]
+            mysql_class, mysql_config = self.get_mysql_config(instances)
+            if not isinstance(self.mysql_thread, mysql_class):
+                print("Switching between [mysql] and [mysql:<name>] sections requires a restart")
+            else:
+                self.mysql_thread.reconfigure(mysql_config)
+
+            for thread in self.threads:
+                if isinstance(thread, ThreadStatsd):
+                    thread.reconfigure(self.get_statsd_config())
+                elif isinstance(thread, ThreadGraphite):
+                    thread.reconfigure(self.config.get('graphite', {}))
+                elif isinstance(thread, ThreadPrometheus):
+                    thread.reconfigure(self.get_prometheus_config())
+        except Exception:
+            print("Reloading the config failed:")
+            traceback.print_exc()
+
+    def make_queue(self):
+        return MetricQueue(
+            max_size=int(self.config['statsd'].get('max_queue_size', 10000)),
+            policy=self.config['statsd'].get('queue_policy', 'drop_oldest')
+        )
 
     def get_config(self, config_file):
         cnf = ConfigParser()
@@ -110,6 +294,24 @@ class MysqlStatsd():
 
         return self.config
 
+    def get_instances(self):
+        """
+        Returns the thread config for every [mysql:<name>] section.
+        Settings in the [mysql] section serve as defaults for all instances,
+        metrics of an instance are prefixed with its name unless it sets a prefix.
+        """
+        instances = []
+        for section in sorted(self.config):
+            if not section.startswith('mysql:'):
+                continue
+            name = section.split(':', 1)[1]
+            mysql_config = dict(self.config.get('mysql', {}))
+            mysql_config.update(self.config[section])
+            mysql_config['name'] = name
+            mysql_config.setdefault('prefix', name)
+            instances.append(dict(mysql=mysql_config, metrics=self.config['metrics']))
+        return instances
+
     def daemonize(self, stdin='/dev/null', stdout='/dev/null', stderr='/dev/null'):
         '''This forks the current process into a daemon. The stdin, stdout, and
         stderr arguments are file names that will be opened and be used to replace
@@ -1,3 +1,8 @@
 from innodb_preprocessor import InnoDBPreprocessor
+from innodb_table_preprocessor import InnoDBTablePreprocessor
+from innodb_metrics_preprocessor import InnoDBMetricsPreprocessor
+from innodb_buffer_pool_preprocessor import InnoDBBufferPoolPreprocessor
+from paged_table_preprocessor import PagedTablePreprocessor
+from digest_preprocessor import DigestPreprocessor
 from mysql_preprocessor import MysqlPreprocessor
 from columns_preprocessor import ColumnsPreprocessor
@@ -0,0 +1,84 @@
+import heapq
+from array import array
+from interface import Preprocessor
+
+
+class DigestPreprocessor(Preprocessor):
+    """
+    Preprocessor for performance_schema.events_statements_summary_by_digest, f.e.:
+    SELECT SCHEMA_NAME, DIGEST, COUNT_STAR, SUM_TIMER_WAIT, SUM_ROWS_EXAMINED, SUM_ROWS_SENT
+    FROM performance_schema.events_statements_summary_by_digest
+
+    Returns how much the counters of the top digests increased since the
+    previous poll, as <schema>.<digest>.<counter>, where only the top digests
+    by latency (or count) are returned and the increase of all others is
+    summed up as other.<counter>. Timer columns are converted from
+    picoseconds to milliseconds.
+
+    The previous counters of every digest are kept in a single array of
+    doubles, indexed by the position of the digest in a dict.
+    """
+    key_columns = ('schema_name', 'digest')
+    counter_names = {
+        'count_star': 'count',
+        'sum_timer_wait': 'latency',
+        'sum_rows_examined': 'rows_examined',
+        'sum_rows_sent': 'rows_sent',
+    }
+    orders = ('latency', 'count')
+    # Picoseconds in a millisecond
+    timer_unit = 1000000000.0
+
+    def __init__(self, top=20, order='latency', *args, **kwargs):
+        super(DigestPreprocessor, self).__init__(*args, **kwargs)
+        if order not in self.orders:
+            raise ValueError("Unknown digest order {0}, use one of {1}".format(order, ", ".join(self.orders)))
+        self.top = top
+        self.order = order
+        self.slots = {}
+        self.previous = array('d')
+
+    def process(self, rows, column_names):
+        lower_names = [column.lower() for column in column_names]
+        keys = [index for index, name in enumerate(lower_names) if name in self.key_columns]
+        counters = [(index, self.counter_names.get(name, name), name.startswith('sum_timer'))
+                    for index, name in enumerate(lower_names) if name not in self.key_columns]
+        names = [name for index, name, is_timer in counters]
+        width = len(counters)
+        order_column = names.index(self.order) if self.order in names else 0
+
+        slots = {}
+        current = array('d')
+        deltas = []
+        for row in rows:
+            key = '.'.join(str(row[index] or 'none').replace('.', '_') for index in keys)
+            values = [float(row[index] or 0) / (self.timer_unit if is_timer else 1)
+                      for index, name, is_timer in counters]
+            slots[key] = len(slots)
+            current.extend(values)
+
+            slot = self.slots.get(key)
+            if slot is None:
+                continue
+            previous = self.previous[slot * width:(slot + 1) * width]
+            delta = [new - old for new, old in zip(values, previous)]
+            # The digest was reset (f.e. TRUNCATE) or didn't run since the previous poll
+            if delta[order_column] <= 0 or min(delta) < 0:
+                continue
+            deltas.append((delta[order_column], key, delta))
+
+        self.slots = slots
+        self.previous = current
+
+        top = heapq.nlargest(self.top, deltas)
+        metrics = [(key + '.' + name, value) for order_value, key, delta in top
+                   for name, value in zip(names, delta)]
+
+        if deltas:
+            top_keys = set(key for order_value, key, delta in top)
+            other = [0.0] * width
+            for order_value, key, delta in deltas:
+                if key not in top_keys:
+                    other = [total + value for total, value in zip(other, delta)]
+            metrics.extend(('other.' + name, value) for name, value in zip(names, other))
+        return metrics
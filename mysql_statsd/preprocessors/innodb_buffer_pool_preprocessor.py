@@ -0,0 +1,58 @@
+from interface import Preprocessor
+
+
+class InnoDBBufferPoolPreprocessor(Preprocessor):
+    """
+    Preprocessor for information_schema.INNODB_BUFFER_POOL_STATS, one row
+    per buffer pool. Columns are turned into the bufferpool_N.* metrics
+    InnoDBPreprocessor reads from the INDIVIDUAL BUFFER POOL INFO section.
+    """
+    metric_names = {
+        'pool_size': 'pool_size',
+        'free_buffers': 'free_pages',
+        'database_pages': 'database_pages',
+        'old_database_pages': 'old_database_pages',
+        'modified_database_pages': 'modified_pages',
+        'pending_reads': 'pending_reads',
+        'pending_flush_lru': 'pending_writes_lru',
+        'pending_flush_list': 'pending_writes_flush_list',
+        'pages_made_young': 'pages_made_young',
+        'pages_not_made_young': 'pages_not_young',
+        'pages_made_young_rate': 'pages_made_young_ps',
+        'pages_made_not_young_rate': 'pages_not_young_ps',
+        'number_pages_read': 'pages_read',
+        'number_pages_created': 'pages_created',
+        'number_pages_written': 'pages_written',
+        'pages_read_rate': 'pages_read_ps',
+        'pages_create_rate': 'pages_created_ps',
+        'pages_written_rate': 'pages_written_ps',
+        'hit_rate': 'buffer_pool_hits',
+        'young_make_per_thousand_gets': 'buffer_pool_young',
+        'not_young_make_per_thousand_gets': 'buffer_pool_not_young',
+        'read_ahead_rate': 'pages_read_ahead',
+        'read_ahead_evicted_rate': 'pages_read_evicted',
+        'lru_io_total': 'io_sum',
+        'lru_io_current': 'io_sum_cur',
+        'uncompress_total': 'io_unzip',
+        'uncompress_current': 'io_unzip_cur',
+    }
+
+    def __init__(self, *args, **kwargs):
+        super(InnoDBBufferPoolPreprocessor, self).__init__(*args, **kwargs)
+
+    def process(self, rows, column_names):
+        if not rows:
+            return []
+
+        lower_names = [column.lower() for column in column_names]
+        pool_column = lower_names.index('pool_id')
+        # Only the columns that have a metric, with their position
+        columns = [(index, self.metric_names[name]) for index, name in enumerate(lower_names)
+                   if name in self.metric_names]
+
+        metrics = []
+        for row in rows:
+            bufferpool = 'bufferpool_{0}.'.format(row[pool_column])
+            for index, name in columns:
+                metrics.append((bufferpool + name, row[index]))
+        return metrics
@@ -0,0 +1,74 @@
+from interface import Preprocessor
+
+
+class InnoDBMetricsPreprocessor(Preprocessor):
+    """
+    Preprocessor for the counters of information_schema.INNODB_METRICS, f.e.:
+    SELECT NAME, COUNT FROM information_schema.INNODB_METRICS WHERE STATUS = 'enabled'
+
+    Counters that SHOW ENGINE INNODB STATUS also reports are renamed to the
+    names InnoDBPreprocessor uses, all others keep their (lowercase) name.
+    Rows of the sys.metrics view (Variable_name, Variable_value) work as well.
+    """
+    name_columns = ('name', 'variable_name')
+    value_columns = ('count', 'variable_value')
+
+    metric_names = {
+        'trx_rseg_history_len': 'history_list',
+        'trx_active_transactions': 'active_transactions',
+        'lock_row_lock_current_waits': 'locked_transactions',
+        'innodb_rwlock_x_spin_waits': 'spin_waits',
+        'innodb_rwlock_x_spin_rounds': 'spin_rounds',
+        'innodb_rwlock_x_os_waits': 'os_waits',
+        'os_data_reads': 'file_reads',
+        'os_data_writes': 'file_writes',
+        'os_data_fsyncs': 'file_fsyncs',
+        'os_pending_reads': 'pending_normal_aio_reads',
+        'os_pending_writes': 'pending_normal_aio_writes',
+        'ibuf_size': 'ibuf_used_cells',
+        'ibuf_merges': 'ibuf_merges',
+        'ibuf_merges_insert': 'ibuf_inserts',
+        'log_writes': 'log_writes',
+        'log_lsn_current': 'log_bytes_written',
+        'log_lsn_last_flush': 'log_bytes_flushed',
+        'log_lsn_last_checkpoint': 'last_checkpoint',
+        'log_pending_log_flushes': 'pending_log_flushes',
+        'log_pending_checkpoint_writes': 'pending_chkp_writes',
+        'buffer_pool_pages_free': 'free_pages',
+        'buffer_pool_pages_data': 'database_pages',
+        'buffer_pool_pages_dirty': 'modified_pages',
+        'buffer_pages_read': 'pages_read',
+        'buffer_pages_created': 'pages_created',
+        'buffer_pages_written': 'pages_written',
+        'dml_inserts': 'rows_inserted',
+        'dml_updates': 'rows_updated',
+        'dml_deletes': 'rows_deleted',
+        'dml_reads': 'rows_read',
+    }
+
+    def __init__(self, *args, **kwargs):
+        super(InnoDBMetricsPreprocessor, self).__init__(*args, **kwargs)
+
+    @staticmethod
+    def find_column(column_names, candidates):
+        lower_names = [column.lower() for column in column_names]
+        for candidate in candidates:
+            if candidate in lower_names:
+                return lower_names.index(candidate)
+        return None
+
+    def process(self, rows, column_names):
+        if not rows:
+            return []
+
+        name_column = self.find_column(column_names, self.name_columns)
+        value_column = self.find_column(column_names, self.value_columns)
+        if name_column is None or value_column is None:
+            # Plain name/value rows
+            name_column, value_column = 0, 1
+
+        metrics = []
+        for row in rows:
+            name = row[name_column].lower()
+            metrics.append((self.metric_names.get(name, name), row[value_column]))
+        return metrics
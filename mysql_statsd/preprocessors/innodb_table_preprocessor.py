@@ -0,0 +1,594 @@
+import fnmatch
+import re
+import zlib
+from innodb_preprocessor import InnoDBPreprocessor
+
+
+def startswith(prefix):
+    return lambda self, line: line.startswith(prefix)
+
+
+def contains(*texts):
+    """Matches lines containing all texts, the first one is used to prefilter lines"""
+    test = lambda self, line: all(text in line for text in texts)
+    test.needle = texts[0]
+    return test
+
+
+def in_transactions(test):
+    guarded = lambda self, line: self.txn_seen == 1 and test(self, line)
+    guarded.needle = getattr(test, 'needle', None)
+    return guarded
+
+
+class InnoDBTablePreprocessor(InnoDBPreprocessor):
+    """
+    Single pass, table driven parser for SHOW ENGINE INNODB STATUS.
+
+    Produces the same output as InnoDBPreprocessor, but instead of copying the
+    whole status three times and running every line through the full chain of
+    tests it walks the text once and dispatches on the first word of a line.
+    Only lines with a matching handler are cleaned up, and only handlers that
+    need the fields of a line tokenise it.
+
+    The handler tables list (first word, test, handler) in the order of the
+    original elif chain so the first matching test still wins. A first word of
+    None means the test is a substring match that applies to any line, those
+    lines are found with a single regex search for the substrings.
+    Tests are run against the line with ',', ';' and '/s' stripped, just like
+    before; the original tests that look for one of those characters could
+    therefore never match and are left out.
+
+    Given the whitelisted metrics, only the sections producing one of them
+    are parsed. The lines of the other sections aren't even split off: the
+    text is searched for the next section header instead. Likewise at most
+    max_section_lines lines of a section are parsed, the number of lines
+    left out is kept in truncated.
+
+    The metrics parsed from every section, and from every buffer pool of
+    INDIVIDUAL BUFFER POOL INFO, are kept with a crc32 of its text. A section
+    that is the same as the previous poll (which on idle servers most are)
+    isn't parsed again, its previous metrics are used.
+    """
+    line_handlers = [
+        ('Mutex', startswith('Mutex spin waits'), 'mutex_spin_waits'),
+        ('RW-excl', startswith('RW-excl spins'), 'rw_excl_spins'),
+        (None, contains('seconds the semaphore:'), 'semaphore_wait'),
+        # TRANSACTIONS
+        ('Trx', startswith('Trx id counter'), 'trx_id_counter'),
+        ('Purge', startswith('Purge done for trx'), 'purge_done'),
+        ('History', startswith('History list length'), 'history_list_length'),
+        ('---TRANSACTION', in_transactions(startswith('---TRANSACTION')), 'transaction'),
+        (None, contains('read views open inside InnoDB'), 'read_views'),
+        ('mysql', startswith('mysql tables in use'), 'tables_in_use'),
+        (None, in_transactions(contains('lock struct(s)')), 'lock_structs'),
+        # FILE I/O
+        ('Pending', startswith('Pending normal aio reads:'), 'pending_aio'),
+        ('ibuf', startswith('ibuf aio reads'), 'pending_ibuf_aio'),
+        ('Pending', startswith('Pending flushes (fsync)'), 'pending_flushes'),
+        # INSERT BUFFER AND ADAPTIVE HASH INDEX
+        ('Ibuf', startswith('Ibuf for space 0: size '), 'ibuf_for_space'),
+        ('Ibuf:', startswith('Ibuf: size '), 'ibuf_size'),
+        ('Hash', startswith('Hash table size '), 'hash_table_size'),
+        # LOG
+        ('Log', startswith('Log sequence number'), 'log_sequence_number'),
+        ('Log', startswith('Log flushed up to'), 'log_flushed'),
+        ('Last', startswith('Last checkpoint at'), 'last_checkpoint'),
+        # BUFFER POOL AND MEMORY
+        ('Total', lambda self, line: line.startswith('Total memory allocated') and 'in additional pool' in line,
+         'total_memory'),
+        ('Adaptive', startswith('Adaptive hash index '), 'adaptive_hash_memory'),
+        ('Page', startswith('Page hash           '), 'page_hash_memory'),
+        ('Dictionary', startswith('Dictionary cache    '), 'dictionary_cache_memory'),
+        ('File', startswith('File system         '), 'file_system_memory'),
+        ('Lock', startswith('Lock system         '), 'lock_system_memory'),
+        ('Recovery', startswith('Recovery system     '), 'recovery_system_memory'),
+        ('Threads', startswith('Threads             '), 'thread_hash_memory'),
+        ('innodb_io_pattern', startswith('innodb_io_pattern   '), 'innodb_io_pattern_memory'),
+        ('Buffer', lambda self, line: line.startswith('Buffer pool size ') and not line.startswith('Buffer pool size bytes'),
+         'pool_size'),
+        ('Free', startswith('Free buffers'), 'free_pages'),
+        ('Database', startswith('Database pages'), 'database_pages'),
+        ('Modified', startswith('Modified db pages'), 'modified_pages'),
+        ('Pages', startswith('Pages read ahead'), 'pages_read_ahead'),
+        ('Pages', startswith('Pages read'), 'pages_read'),
+        # ROW OPERATIONS
+        ('Number', startswith('Number of rows inserted'), 'rows'),
+    ]
+
+    bufferpool_handlers = [
+        ('Buffer', lambda self, line: line.startswith('Buffer pool size ') and not line.startswith('Buffer pool size bytes'),
+         'bp_pool_size'),
+        ('Buffer', startswith('Buffer pool size bytes'), 'bp_pool_size_bytes'),
+        ('Free', startswith('Free buffers'), 'bp_free_pages'),
+        ('Database', startswith('Database pages'), 'bp_database_pages'),
+        ('Old', startswith('Old database pages'), 'bp_old_database_pages'),
+        ('Modified', startswith('Modified db pages'), 'bp_modified_pages'),
+        ('Pending', startswith('Pending reads'), 'bp_pending_reads'),
+        ('Pending', startswith('Pending writes'), 'bp_pending_writes'),
+        ('Pages', startswith('Pages made young'), 'bp_pages_made_young'),
+        ('Pages', startswith('Pages read ahead'), 'bp_pages_read_ahead'),
+        ('Pages', startswith('Pages read'), 'bp_pages_read'),
+        (None, contains('creates', 'reads'), 'bp_pages_read_ps'),
+        ('Buffer', startswith('Buffer pool hit rate'), 'bp_hit_rate'),
+        ('LRU', startswith('LRU len:'), 'bp_lru_len'),
+        ('I/O', startswith('I/O sum'), 'bp_io_sum'),
+    ]
+
+    # The metrics the lines of every section produce. LOG has a header of
+    # only three dashes, so its lines are part of the section before it.
+    section_metrics = {
+        'SEMAPHORES': ('spin_waits', 'spin_rounds', 'os_waits', 'innodb_sem_waits', 'innodb_sem_wait_time_ms'),
+        'TRANSACTIONS': ('innodb_transactions', 'unpurged_txns', 'history_list', 'current_transactions',
+                         'active_transactions', 'read_views', 'innodb_tables_in_use', 'innodb_locked_tables',
+                         'innodb_lock_structs', 'locked_transactions'),
+        'FILE I/O': ('pending_normal_aio_reads', 'pending_normal_aio_writes', 'pending_ibuf_aio_reads',
+                     'pending_aio_log_ios', 'pending_aio_sync_ios', 'pending_log_flushes', 'pending_buf_pool_flushes'),
+        'INSERT BUFFER AND ADAPTIVE HASH INDEX': ('ibuf_used_cells', 'ibuf_free_cells', 'ibuf_cell_count',
+                                                  'ibuf_merges', 'hash_index_cells_total', 'hash_index_cells_used',
+                                                  'log_bytes_written', 'log_bytes_flushed', 'last_checkpoint'),
+        'LOG': ('log_bytes_written', 'log_bytes_flushed', 'last_checkpoint'),
+        'BUFFER POOL AND MEMORY': ('total_mem_alloc', 'additional_pool_alloc', 'adaptive_hash_memory',
+                                   'page_hash_memory', 'dictionary_cache_memory', 'file_system_memory',
+                                   'lock_system_memory', 'recovery_system_memory', 'thread_hash_memory',
+                                   'innodb_io_pattern_memory', 'pool_size', 'free_pages', 'database_pages',
+                                   'modified_pages', 'pages_read', 'pages_created', 'pages_written'),
+        'INDIVIDUAL BUFFER POOL INFO': ('bufferpool_*.*',),
+        'ROW OPERATIONS': ('rows_inserted', 'rows_updated', 'rows_deleted', 'rows_read', 'read_views'),
+    }
+
+    # Metrics summed over all lines, and so over sections, instead of set
+    accumulated = ('innodb_sem_waits', 'innodb_sem_wait_time_ms', 'current_transactions', 'active_transactions',
+                   'innodb_tables_in_use', 'innodb_locked_tables', 'innodb_lock_structs', 'locked_transactions')
+
+    def __init__(self, metrics=None, max_section_lines=0, *args, **kwargs):
+        super(InnoDBTablePreprocessor, self).__init__(*args, **kwargs)
+        self.line_table = self.compile_table(self.line_handlers)
+        self.bufferpool_table = self.compile_table(self.bufferpool_handlers)
+        self.bufferpool = 'bufferpool_0.'
+        self.sections = None if metrics is None else self.needed_sections(metrics)
+        self.max_section_lines = max_section_lines
+        self.truncated = 0
+        # Per section (or buffer pool) its fingerprint, the metrics parsed from it
+        # and the parser state after it
+        self.section_cache = {}
+
+    def needed_sections(self, metrics):
+        """ The sections producing any of the metrics, which may contain * wildcards """
+        return set(section for section, names in self.section_metrics.items()
+                   if any(fnmatch.fnmatchcase(name, metric) or fnmatch.fnmatchcase(metric, name)
+                          for name in names for metric in metrics))
+
+    def skip(self, section):
+        return self.sections is not None and section not in self.sections
+
+    @staticmethod
+    def section_end(text, position):
+        """
+        Position of the line starting the section after the one at position:
+        the next line starting with four dashes, except for those ending an
+        oldest view. Past the end of the text when there is none.
+        """
+        if position == 0 and text.startswith('----'):
+            return 0
+        start = max(position - 1, 0)
+        while True:
+            header = text.find('\n----', start)
+            if header < 0:
+                return len(text) + 1
+            view = text.find('\n---OLDEST VIEW---', start, header)
+            if view < 0:
+                return header + 1
+            # The dashes after ---OLDEST VIEW--- close it instead
+            start = text.find('\n----', view + 1)
+            if start < 0:
+                return len(text) + 1
+            start += 1
+
+    def compile_table(self, handlers):
+        """
+        Returns a dict of first word to its ordered (position, test, handler)
+        entries, the entries that apply to any line and a regex finding the
+        lines those could match.
+        """
+        by_word = {}
+        any_line = []
+        for position, (word, test, handler) in enumerate(handlers):
+            entry = (position, test, getattr(self, 'handle_' + handler))
+            if word is None:
+                any_line.append(entry)
+            else:
+                by_word.setdefault(word, []).append(entry)
+        needles = re.compile('|'.join(re.escape(test.needle) for position, test, handler in any_line))
+        # Candidates for lines that contain one of the needles, by first word
+        with_any_line = dict((word, sorted(entries + any_line)) for word, entries in by_word.items())
+        return by_word, with_any_line, any_line, needles
+
+    def process(self, rows):
+        self.clear_variables()
+        self.bufferpool = 'bufferpool_0.'
+        self.truncated = 0
+        stats = {}
+        current_chunk = 'junk'
+        next_chunk = False
+
+        for row in rows:
+            text = row[2]
+            end = len(text)
+            position = 0
+            while position <= end:
+                if next_chunk:
+                    # Section names are between lines of dashes, like InnoDBPreprocessor does
+                    line, position = self.read_line(text, position)
+                    if line.startswith('----'):
+                        next_chunk = False
+                    else:
+                        current_chunk = self.clean(line)
+                    continue
+
+                section_end = self.section_end(text, position)
+                if not self.skip(current_chunk):
+                    self.parse_section(current_chunk, text, position, min(section_end, end), stats)
+                position = section_end
+                if position <= end:
+                    line, position = self.read_line(text, position)
+                    next_chunk = True
+
+        self.tmp_stats = stats
+        return stats.items()
+
+    @staticmethod
+    def read_line(text, position):
+        """ Returns the line at position and the position of the next one """
+        newline = text.find('\n', position)
+        if newline < 0:
+            newline = len(text)
+        return text[position:newline], newline + 1
+
+    def parse_section(self, chunk, text, start, stop, stats):
+        """ Parse a section, every buffer pool of INDIVIDUAL BUFFER POOL INFO on its own """
+        bounds = [start]
+        if chunk == 'INDIVIDUAL BUFFER POOL INFO':
+            pool = text.find('\n---BUFFER POOL', start, stop)
+            while pool >= 0:
+                bounds.append(pool + 1)
+                pool = text.find('\n---BUFFER POOL', pool + 1, stop)
+        bounds.append(stop)
+
+        for index in range(len(bounds) - 1):
+            self.parse_block((chunk, index), chunk, text[bounds[index]:bounds[index + 1]], stats)
+
+    def parse_block(self, key, chunk, body, stats):
+        """
+        Parses the lines of (part of) a section into stats. The result is
+        reused as long as the text and the parser state it starts with are
+        the same as the previous time, so unchanged sections aren't parsed.
+        """
+        fingerprint = (zlib.crc32(body), len(body), self.txn_seen, self.bufferpool)
+        cached = self.section_cache.get(key)
+        if cached is None or cached[0] != fingerprint:
+            self.tmp_stats = {}
+            truncated = self.parse_lines(chunk, body)
+            cached = self.section_cache[key] = (fingerprint, self.tmp_stats, self.txn_seen, self.bufferpool, truncated)
+        fingerprint, result, self.txn_seen, self.bufferpool, truncated = cached
+        self.truncated += truncated
+
+        for name, value in result.iteritems():
+            if name in self.accumulated and name in stats:
+                stats[name] = stats[name] + value
+            else:
+                stats[name] = value
+
+    def parse_lines(self, chunk, body):
+        """ Dispatch at most max_section_lines lines, returns the number of lines left out """
+        table = self.bufferpool_table if chunk == 'INDIVIDUAL BUFFER POOL INFO' else self.line_table
+        lines_left = self.max_section_lines
+        end = len(body)
+        position = 0
+        while position < end:
+            line, position = self.read_line(body, position)
+            # Dashes closing an oldest view
+            if line.startswith('----'):
+                continue
+            if self.max_section_lines:
+                if lines_left == 0:
+                    return body.count('\n', position) + 1
+                lines_left -= 1
+
+            if chunk == 'INDIVIDUAL BUFFER POOL INFO' and line.startswith('---'):
+                # ---BUFFER POOL X
+                self.bufferpool = 'bufferpool_' + self._INNO_LINE.split(self.clean(line))[2] + '.'
+            else:
+                self.dispatch(line, table)
+        return 0
+
+    @staticmethod
+    def clean(line):
+        return line.replace(',', '').replace(';', '').replace('/s', '')
+
+    def dispatch(self, line, table):
+        by_word, with_any_line, any_line, needles = table
+        space = line.find(' ')
+        word = line[:space] if space >= 0 else line
+        if ',' in word or ';' in word:
+            word = word.replace(',', '').replace(';', '')
+
+        if needles.search(line):
+            candidates = with_any_line.get(word, any_line)
+        else:
+            candidates = by_word.get(word)
+            if not candidates:
+                return
+
+        line = self.clean(line)
+        for position, test, handler in candidates:
+            if test(self, line):
+                handler(line)
+                return
+
+    # Handlers for the main sections, see InnoDBPreprocessor.process_line
+    # for examples of the lines they parse.
+    def handle_mutex_spin_waits(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['spin_waits'] = innorow[3]
+        self.tmp_stats['spin_rounds'] = innorow[5]
+        self.tmp_stats['os_waits'] = innorow[8]
+
+    def handle_rw_excl_spins(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['spin_waits'] = innorow[2]
+        self.tmp_stats['os_waits'] = innorow[7]
+
+    def handle_semaphore_wait(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats = self.increment(self.tmp_stats, 'innodb_sem_waits', 1)
+        if 'innodb_sem_wait_time_ms' in self.tmp_stats:
+            self.tmp_stats['innodb_sem_wait_time_ms'] = float(self.tmp_stats['innodb_sem_wait_time_ms']) + float(innorow[9]) * 1000
+        else:
+            self.tmp_stats['innodb_sem_wait_time_ms'] = float(innorow[9]) * 1000
+
+    def handle_trx_id_counter(self, line):
+        innorow = self._INNO_LINE.split(line)
+        if len(innorow) == 4:
+            innorow.append(0)
+        self.tmp_stats['innodb_transactions'] = self.make_bigint(innorow[3], innorow[4])
+        self.txn_seen = 1
+
+    def handle_purge_done(self, line):
+        innorow = self._INNO_LINE.split(line)
+        if innorow[7] == 'undo':
+            innorow[7] = 0
+        self.tmp_stats['unpurged_txns'] = int(self.tmp_stats['innodb_transactions']) - self.make_bigint(innorow[6], innorow[7])
+
+    def handle_history_list_length(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['history_list'] = innorow[3]
+
+    def handle_transaction(self, line):
+        self.tmp_stats = self.increment(self.tmp_stats, 'current_transactions', 1)
+        if 'ACTIVE' in line:
+            self.tmp_stats = self.increment(self.tmp_stats, 'active_transactions', 1)
+
+    def handle_read_views(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['read_views'] = innorow[0]
+
+    def handle_tables_in_use(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats = self.increment(self.tmp_stats, 'innodb_tables_in_use', innorow[4])
+        self.tmp_stats = self.increment(self.tmp_stats, 'innodb_locked_tables', innorow[6])
+
+    def handle_lock_structs(self, line):
+        innorow = self._INNO_LINE.split(line)
+        if line.startswith('LOCK WAIT'):
+            self.tmp_stats = self.increment(self.tmp_stats, 'innodb_lock_structs', innorow[2])
+            self.tmp_stats = self.increment(self.tmp_stats, 'locked_transactions', 1)
+        else:
+            self.tmp_stats = self.increment(self.tmp_stats, 'innodb_lock_structs', innorow[0])
+
+    def handle_pending_aio(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['pending_normal_aio_reads'] = innorow[4]
+        self.tmp_stats['pending_normal_aio_writes'] = innorow[7]
+
+    def handle_pending_ibuf_aio(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['pending_ibuf_aio_reads'] = innorow[3]
+        self.tmp_stats['pending_aio_log_ios'] = innorow[6]
+        self.tmp_stats['pending_aio_sync_ios'] = innorow[9]
+
+    def handle_pending_flushes(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['pending_log_flushes'] = innorow[4]
+        self.tmp_stats['pending_buf_pool_flushes'] = innorow[7]
+
+    def handle_ibuf_for_space(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['ibuf_used_cells'] = innorow[5]
+        self.tmp_stats['ibuf_free_cells'] = innorow[9]
+        self.tmp_stats['ibuf_cell_count'] = innorow[12]
+
+    def handle_ibuf_size(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['ibuf_used_cells'] = innorow[2]
+        self.tmp_stats['ibuf_free_cells'] = innorow[6]
+        self.tmp_stats['ibuf_cell_count'] = innorow[9]
+        if 'merges' in line:
+            self.tmp_stats['ibuf_merges'] = innorow[10]
+
+    def handle_hash_table_size(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['hash_index_cells_total'] = innorow[3]
+        if 'used cells' in line:
+            self.tmp_stats['hash_index_cells_used'] = innorow[6]
+        else:
+            self.tmp_stats['hash_index_cells_used'] = 0
+
+    def handle_log_sequence_number(self, line):
+        innorow = self._INNO_LINE.split(line)
+        if len(innorow) > 4:
+            self.tmp_stats['log_bytes_written'] = self.make_bigint(innorow[3], innorow[4])
+        else:
+            self.tmp_stats['log_bytes_written'] = innorow[3]
+
+    def handle_log_flushed(self, line):
+        innorow = self._INNO_LINE.split(line)
+        if len(innorow) > 5:
+            self.tmp_stats['log_bytes_flushed'] = self.make_bigint(innorow[4], innorow[5])
+        else:
+            self.tmp_stats['log_bytes_flushed'] = innorow[4]
+
+    def handle_last_checkpoint(self, line):
+        innorow = self._INNO_LINE.split(line)
+        if len(innorow) > 4:
+            self.tmp_stats['last_checkpoint'] = self.make_bigint(innorow[3], innorow[4])
+        else:
+            self.tmp_stats['last_checkpoint'] = innorow[3]
+
+    def handle_total_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['total_mem_alloc'] = innorow[3]
+        self.tmp_stats['additional_pool_alloc'] = innorow[8]
+
+    def handle_adaptive_hash_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['adaptive_hash_memory'] = innorow[3]
+
+    def handle_page_hash_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['page_hash_memory'] = innorow[2]
+
+    def handle_dictionary_cache_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['dictionary_cache_memory'] = innorow[2]
+
+    def handle_file_system_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['file_system_memory'] = innorow[2]
+
+    def handle_lock_system_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['lock_system_memory'] = innorow[2]
+
+    def handle_recovery_system_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['recovery_system_memory'] = innorow[2]
+
+    def handle_thread_hash_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['thread_hash_memory'] = innorow[1]
+
+    def handle_innodb_io_pattern_memory(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['innodb_io_pattern_memory'] = innorow[1]
+
+    def handle_pool_size(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['pool_size'] = innorow[3]
+
+    def handle_free_pages(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['free_pages'] = innorow[2]
+
+    def handle_database_pages(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['database_pages'] = innorow[2]
+
+    def handle_modified_pages(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['modified_pages'] = innorow[3]
+
+    def handle_pages_read_ahead(self, line):
+        # TODO: No-op for now, see issue 134.
+        self.tmp_stats['empty'] = ''
+
+    def handle_pages_read(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['pages_read'] = innorow[2]
+        self.tmp_stats['pages_created'] = innorow[4]
+        self.tmp_stats['pages_written'] = innorow[6]
+
+    def handle_rows(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats['rows_inserted'] = innorow[4]
+        self.tmp_stats['rows_updated'] = innorow[6]
+        self.tmp_stats['rows_deleted'] = innorow[8]
+        self.tmp_stats['rows_read'] = innorow[10]
+
+    # Handlers for INDIVIDUAL BUFFER POOL INFO, see
+    # InnoDBPreprocessor.process_individual_bufferpools for examples.
+    def handle_bp_pool_size(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pool_size'] = innorow[3]
+
+    def handle_bp_pool_size_bytes(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pool_size_bytes'] = innorow[4]
+
+    def handle_bp_free_pages(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'free_pages'] = innorow[2]
+
+    def handle_bp_database_pages(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'database_pages'] = innorow[2]
+
+    def handle_bp_old_database_pages(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'old_database_pages'] = innorow[3]
+
+    def handle_bp_modified_pages(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'modified_pages'] = innorow[3]
+
+    def handle_bp_pending_reads(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pending_reads'] = innorow[2]
+
+    def handle_bp_pending_writes(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pending_writes_lru'] = self._DIGIT_LINE.findall(innorow[3])[0]
+        self.tmp_stats[self.bufferpool + 'pending_writes_flush_list'] = self._DIGIT_LINE.findall(innorow[6])[0]
+        self.tmp_stats[self.bufferpool + 'pending_writes_single_page'] = innorow[9]
+
+    def handle_bp_pages_made_young(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pages_made_young'] = innorow[3]
+        self.tmp_stats[self.bufferpool + 'pages_not_young'] = innorow[6]
+
+    def handle_bp_pages_read_ahead(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pages_read_ahead'] = self._DIGIT_LINE.findall(innorow[3])[0]
+        self.tmp_stats[self.bufferpool + 'pages_read_evicted'] = self._DIGIT_LINE.findall(innorow[7])[0]
+        self.tmp_stats[self.bufferpool + 'pages_read_random'] = self._DIGIT_LINE.findall(innorow[11])[0]
+
+    def handle_bp_pages_read(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pages_read'] = innorow[2]
+        self.tmp_stats[self.bufferpool + 'pages_created'] = innorow[4]
+        self.tmp_stats[self.bufferpool + 'pages_written'] = innorow[6]
+
+    def handle_bp_pages_read_ps(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'pages_read_ps'] = innorow[0]
+        self.tmp_stats[self.bufferpool + 'pages_created_ps'] = innorow[2]
+        self.tmp_stats[self.bufferpool + 'pages_written_ps'] = innorow[4]
+
+    def handle_bp_hit_rate(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'buffer_pool_hit_total'] = self._DIGIT_LINE.findall(innorow[6])[0]
+        self.tmp_stats[self.bufferpool + 'buffer_pool_hits'] = innorow[4]
+        self.tmp_stats[self.bufferpool + 'buffer_pool_young'] = innorow[9]
+        self.tmp_stats[self.bufferpool + 'buffer_pool_not_young'] = innorow[13]
+
+    def handle_bp_lru_len(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'lru_len'] = self._DIGIT_LINE.findall(innorow[2])[0]
+        self.tmp_stats[self.bufferpool + 'lru_unzip'] = innorow[5]
+
+    def handle_bp_io_sum(self, line):
+        innorow = self._INNO_LINE.split(line)
+        self.tmp_stats[self.bufferpool + 'io_sum'] = self._DIGIT_LINE.findall(innorow[1])[0]
+        self.tmp_stats[self.bufferpool + 'io_sum_cur'] = self._DIGIT_LINE.findall(innorow[1])[1]
+        self.tmp_stats[self.bufferpool + 'io_unzip'] = self._DIGIT_LINE.findall(innorow[3])[0]
+        self.tmp_stats[self.bufferpool + 'io_unzip_cur'] = self._DIGIT_LINE.findall(innorow[3])[0]
@@ -0,0 +1,101 @@
+import heapq
+from interface import Preprocessor
+
+
+class PagedTablePreprocessor(Preprocessor):
+    """
+    Preprocessor for per table (or per index) statistics, read one page per
+    poll so a server with many tables isn't asked for all of them at once.
+
+    The query is a template that selects the rows after the last row of the
+    previous page, ordered by its key columns (schema, table and index name),
+    f.e.:
+    SELECT OBJECT_SCHEMA, OBJECT_NAME, COUNT_READ, COUNT_WRITE
+    FROM performance_schema.table_io_waits_summary_by_table
+    WHERE (OBJECT_SCHEMA, OBJECT_NAME) > ({0}, {1})
+    ORDER BY OBJECT_SCHEMA, OBJECT_NAME LIMIT {limit}
+
+    The counters of every table are remembered and only the increase of the
+    counters that changed since the table was seen last is returned, as
+    <schema>.<table>.<column>, busiest tables first and at most max_keys
+    metrics per page. Gauge columns, like the TABLE_ROWS and DATA_LENGTH of
+    information_schema.TABLES, are returned as they are when they changed
+    or the table is new. Tables that weren't seen during a full pass are
+    forgotten.
+    """
+    key_columns = ('table_schema', 'table_name', 'object_schema', 'object_name', 'index_name')
+    gauge_columns = ('table_rows', 'avg_row_length', 'data_length', 'index_length', 'data_free')
+
+    def __init__(self, page_size=1000, max_keys=0, gauges=None, *args, **kwargs):
+        super(PagedTablePreprocessor, self).__init__(*args, **kwargs)
+        self.page_size = page_size
+        self.max_keys = max_keys
+        self.gauges = frozenset(self.gauge_columns if gauges is None else gauges)
+        # Key column values of the last row of the previous page, None to start over
+        self.after = None
+        # Per table the pass it was last seen in and its counters
+        self.counters = {}
+        self.cycle = 0
+
+    @staticmethod
+    def literal(value):
+        return "'" + str(value).replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+    def query(self, template):
+        """ The query for the next page """
+        literals = [self.literal(value) for value in (self.after or ())]
+        # Start with the rows after the empty key, there are at most as many key columns
+        literals.extend(["''"] * (len(self.key_columns) - len(literals)))
+        return template.format(*literals, limit=self.page_size)
+
+    def process(self, rows, column_names):
+        lower_names = [column.lower() for column in column_names]
+        keys = [index for index, name in enumerate(lower_names) if name in self.key_columns]
+        values = [(index, name) for index, name in enumerate(lower_names) if name not in self.key_columns]
+
+        gauges = [name in self.gauges for index, name in values]
+        changed = []
+        for row in rows:
+            # Dots would add components to the metric names
+            key = '.'.join(str(row[index]).replace('.', '_') for index in keys)
+            counters = tuple(row[index] or 0 for index, name in values)
+            previous = self.counters.get(key)
+            self.counters[key] = (self.cycle, counters)
+            if previous is not None and previous[1] == counters:
+                continue
+
+            metrics = []
+            total = 0
+            olds = previous[1] if previous is not None else (None,) * len(counters)
+            for (index, name), is_gauge, new, old in zip(values, gauges, counters, olds):
+                if is_gauge:
+                    if new != old:
+                        metrics.append((name, new))
+                # Counters that went down were reset, f.e. by TRUNCATE
+                elif old is not None and new > old:
+                    metrics.append((name, new - old))
+                    total += new - old
+            if metrics:
+                changed.append((total, key, metrics))
+
+        if len(rows) < self.page_size:
+            self.finish_cycle()
+        else:
+            self.after = tuple(rows[-1][index] for index in keys)
+
+        # Every table has at least one metric, so max_keys tables are enough
+        if self.max_keys and len(changed) > self.max_keys:
+            changed = heapq.nlargest(self.max_keys, changed)
+        else:
+            changed.sort(reverse=True)
+
+        metrics = [(key + '.' + name, value) for total, key, values in changed for name, value in values]
+        if self.max_keys:
+            return metrics[:self.max_keys]
+        return metrics
+
+    def finish_cycle(self):
+        """ A full pass is done, forget the tables that weren't seen anymore """
+        self.counters = dict((key, state) for key, state in self.counters.iteritems() if state[0] == self.cycle)
+        self.cycle += 1
+        self.after = None
@@ -0,0 +1,154 @@
+import errno
+import os
+import signal
+import sys
+import time
+import traceback
+
+
+class ProcessSupervisor(object):
+    """
+    Runs target(index, shard) in a forked worker process for every shard,
+    so the polling and parsing of the shards runs on multiple cores. Workers
+    that die are restarted until the supervisor gets SIGINT or SIGTERM, which
+    it passes on to the workers.
+
+    SIGHUP calls reload, which returns the new shards for workers started
+    from then on, and is passed on to the workers to reload themselves.
+    """
+    # Workers that die within min_uptime seconds are restarted after a delay
+    # that doubles on every crash, up to max_restart_delay seconds
+    min_uptime = 10
+    restart_delay = 1
+    max_restart_delay = 60
+    # Seconds between checks for exited workers while restarts are pending
+    poll_interval = 0.5
+
+    def __init__(self, shards, target, reload=None):
+        self.shards = shards
+        self.target = target
+        self.reload = reload
+        self.workers = {}
+        self.crashes = [0] * len(shards)
+        # Time every shard without a worker is restarted at
+        self.restarts = {}
+        self.quitting = False
+
+    def start_worker(self, index):
+        pid = os.fork()
+        if pid == 0:
+            # Worker process, the target sets up its own signal handling
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Ignored until the target handles it, SIGHUP would kill the worker
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            code = 0
+            try:
+                self.target(index, self.shards[index])
+            except SystemExit as ex:
+                code = ex.code
+                if code is not None and not isinstance(code, (int, long)):
+                    # Like the interpreter, print a message and exit with 1
+                    sys.stderr.write("{0}\n".format(code))
+                    code = 1
+            except Exception:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code or 0)
+
+        print("Started worker {0} for shard {1}".format(pid, index))
+        self.workers[pid] = (index, time.time())
+        return pid
+
+    def signal_handler(self, signum, frame):
+        """ Stop restarting workers and ask them to quit """
+        print("Caught signal {0}, stopping workers".format(signum))
+        self.quitting = True
+        # Workers waiting to be restarted stay down
+        self.restarts.clear()
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def reload_handler(self, signum, frame):
+        """ Reload the shards and have the workers reload """
+        if self.quitting:
+            return
+        if self.reload is not None:
+            shards = self.reload()
+            if shards is not None and len(shards) == len(self.shards):
+                self.shards = shards
+            elif shards is not None:
+                print("The number of worker processes only changes on restart")
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except OSError:
+                pass
+
+    def get_restart_delay(self, index, uptime):
+        if uptime >= self.min_uptime:
+            self.crashes[index] = 0
+            return 0
+        self.crashes[index] += 1
+        return min(self.max_restart_delay, self.restart_delay * 2 ** (self.crashes[index] - 1))
+
+    def start_due_workers(self):
+        """ Start the workers whose restart delay has passed """
+        now = time.time()
+        for index, restart_at in self.restarts.items():
+            if restart_at <= now and not self.quitting:
+                del self.restarts[index]
+                self.start_worker(index)
+
+    def wait(self):
+        """
+        Waits for a worker to exit and returns (pid, status). While restarts
+        are pending returns (0, 0) once the first of them is due instead.
+        """
+        if not self.restarts or self.quitting:
+            return os.waitpid(-1, 0)
+        restart_at = min(self.restarts.values())
+        while time.time() < restart_at and not self.quitting:
+            if self.workers:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid:
+                    return pid, status
+            time.sleep(max(0, min(self.poll_interval, restart_at - time.time())))
+        return 0, 0
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+        signal.signal(signal.SIGHUP, self.reload_handler)
+
+        for index in range(len(self.shards)):
+            self.start_worker(index)
+
+        # Restarts are scheduled, so a worker waiting to be restarted doesn't
+        # hold up the restart of others
+        while self.workers or (self.restarts and not self.quitting):
+            try:
+                pid, status = self.wait()
+            except OSError as ex:
+                if ex.errno == errno.EINTR:
+                    continue
+                raise
+            self.start_due_workers()
+
+            if pid not in self.workers:
+                continue
+            index, started = self.workers.pop(pid)
+            if self.quitting:
+                continue
+
+            delay = self.get_restart_delay(index, time.time() - started)
+            print("Worker {0} for shard {1} exited with status {2}, restarting in {3}s".format(
+                pid, index, status, delay))
+            self.restarts[index] = time.time() + delay
+            self.start_due_workers()
@@ -3,6 +3,7 @@ import threading
 
 class ThreadBase(threading.Thread):
     run = True
+    new_config = None
 
     def __init__(self, queue, **kwargs):
         threading.Thread.__init__(self)
@@ -13,3 +14,23 @@ class ThreadBase(threading.Thread):
 
     def stop(self):
         self.run = False
+
+    def reconfigure(self, config):
+        """ Hand over a reloaded config, the thread applies it itself with apply_config """
+        self.new_config = config
+
+    def apply_config(self):
+        """
+        Runs configure with the reloaded config, on the thread itself.
+        Returns the attributes from before, so state can be carried over,
+        or None when the config was invalid and the previous one is kept.
+        """
+        config, self.new_config = self.new_config, None
+        previous = dict(self.__dict__)
+        try:
+            self.configure(config)
+        except Exception as ex:
+            self.__dict__.update(previous)
+            print("Reloading the config of {0} failed, keeping the previous one: {1!r}".format(self.getName(), ex))
+            return None
+        return previous
@@ -0,0 +1,158 @@
+import collections
+import cPickle as pickle
+import distutils.util
+import Queue
+import socket
+import struct
+import time
+from metric_registry import MetricRegistry
+from thread_base import ThreadBase
+
+
+class ThreadGraphite(ThreadBase):
+    """
+    Sends metrics to Graphite (carbon) over a persistent TCP connection, in
+    the plaintext or pickle protocol. Every metric keeps the timestamp of the
+    check it was collected by, all check results waiting are sent at once.
+    While carbon can't be reached, at most max_pending of these sends are
+    kept and the oldest are dropped.
+    """
+    def configure(self, config):
+        self.host = config.get('host', 'localhost')
+        self.protocol = config.get('protocol', 'plaintext')
+        if self.protocol not in ('plaintext', 'pickle'):
+            raise ValueError("Unknown graphite protocol {0}, use plaintext or pickle".format(self.protocol))
+        self.port = int(config.get('port', 2004 if self.protocol == 'pickle' else 2003))
+
+        self.prefix = config.get('prefix', 'mysql')
+        if distutils.util.strtobool(config.get('include_hostname', 'true')):
+            self.prefix += "." + socket.gethostname().replace('.', '_')
+
+        self.timeout = int(config.get('timeout', 10))
+        self.reconnect_delay = int(config.get('reconnect_delay', 5000))/1000.0
+        self.pending = collections.deque(maxlen=int(config.get('max_pending', 1000)))
+
+        self.registry = MetricRegistry()
+        self.paths = {}
+        self.sock = None
+        self.reconnect_at = 0
+
+    def reconfigure(self, config):
+        super(ThreadGraphite, self).reconfigure(config)
+        # Wake up the sender in case it's waiting for metrics
+        self.queue.put((time.time(), []))
+
+    def apply_config(self):
+        """
+        Applies a reloaded config, keeping the values deltas are computed
+        against, the pending sends and, unless carbon moved, the connection
+        """
+        previous = super(ThreadGraphite, self).apply_config()
+        if previous is None:
+            return
+        self.registry = previous['registry']
+        # Sends encoded in the other protocol would be garbage to carbon
+        if self.protocol == previous['protocol']:
+            self.pending.extend(previous['pending'])
+        if (self.host, self.port, self.timeout) == (previous['host'], previous['port'], previous['timeout']):
+            self.sock, self.reconnect_at = previous['sock'], previous['reconnect_at']
+        elif previous['sock'] is not None:
+            print("Sending to graphite {0}:{1} from now on".format(self.host, self.port))
+            previous['sock'].close()
+
+    def get_path(self, key):
+        path = self.paths.get(key)
+        if path is None:
+            path = self.paths[key] = (self.prefix + "." + key if self.prefix else key).encode('utf-8')
+        return path
+
+    def get_samples(self, batch):
+        """
+        Returns (path, value, timestamp) for every metric of a check result.
+        Deltas (d) and rates (p) are computed against the previous result,
+        negative ones (f.e. after a server restart) are left out.
+        """
+        (timestamp, samples) = batch
+        result = []
+        tracked = []
+        for key, value, metric_type in samples:
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                continue
+            if metric_type in ('d', 'p'):
+                tracked.append((key, value, metric_type))
+            else:
+                result.append((self.get_path(key), value, timestamp))
+
+        if tracked:
+            deltas, rates = self.registry.update([k for k, v, t in tracked], [v for k, v, t in tracked], timestamp)
+            for (key, value, metric_type), delta, rate in zip(tracked, deltas, rates):
+                value = delta if metric_type == 'd' else rate
+                # NaN fails this comparison as well
+                if value >= 0:
+                    result.append((self.get_path(key), value, timestamp))
+        return result
+
+    def encode(self, samples):
+        if self.protocol == 'pickle':
+            payload = pickle.dumps([(path, (int(timestamp), value)) for path, value, timestamp in samples], 2)
+            return struct.pack('!L', len(payload)) + payload
+        return ''.join("%s %r %d\n" % (path, value, timestamp) for path, value, timestamp in samples)
+
+    def connect(self):
+        try:
+            self.sock = socket.create_connection((self.host, self.port), self.timeout)
+            return True
+        except socket.error as ex:
+            print("Failed to connect to graphite {0}:{1}: {2}".format(self.host, self.port, ex))
+            self.sock = None
+            self.reconnect_at = time.time() + self.reconnect_delay
+            return False
+
+    def send_pending(self):
+        """ Send everything pending, reconnecting when needed """
+        if self.sock is None:
+            if time.time() < self.reconnect_at or not self.connect():
+                return
+
+        while self.pending:
+            try:
+                self.sock.sendall(self.pending[0])
+            except socket.error as ex:
+                print("Failed to send to graphite: {0}".format(ex))
+                self.sock.close()
+                self.sock = None
+                self.reconnect_at = time.time() + self.reconnect_delay
+                return
+            self.pending.popleft()
+
+    def get_timeout(self):
+        """ Wait for metrics, but retry pending ones once we may reconnect """
+        if not self.pending:
+            return None
+        return max(0, self.reconnect_at - time.time())
+
+    def stop(self):
+        super(ThreadGraphite, self).stop()
+        # Wake up the sender in case it's waiting for metrics
+        self.queue.put((time.time(), []))
+
+    def run(self):
+        while self.run:
+            if self.new_config is not None:
+                self.apply_config()
+            try:
+                samples = []
+                for batch in self.queue.get_all(True, self.get_timeout()):
+                    samples.extend(self.get_samples(batch))
+                if samples:
+                    self.pending.append(self.encode(samples))
+            except Queue.Empty:
+                pass
+            self.send_pending()
+
+        if self.sock is not None:
+            self.sock.close()
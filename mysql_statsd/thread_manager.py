@@ -10,15 +10,19 @@ class ThreadManager():
     quitting = False
     threads = []
 
-    def __init__(self, threads=[]):
+    def __init__(self, threads=[], reload=None):
         """Program entry point"""
         self.threads = threads
+        # Called on SIGHUP to re-read the config
+        self.reload = reload
         self.register_signal_handlers()
 
     def register_signal_handlers(self):
         # Register signal handler
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
+        if self.reload is not None:
+            signal.signal(signal.SIGHUP, self.reload_handler)
 
     def run(self):
         """Main loop."""
@@ -27,6 +31,10 @@ class ThreadManager():
             time.sleep(1)
 
             dead = [thread for thread in self.threads if not thread.is_alive()]
+            if dead and not self.quitting and all(getattr(thread, 'finished', False) for thread in dead):
+                # Threads with a finite amount of work, like a replay, are done
+                self.stop_threads()
+                return
             if dead and not self.quitting:
                 print("Thread {0!r} has stopped unexpectedly.".format(thread))
                 self.stop_threads()
@@ -46,6 +54,13 @@ class ThreadManager():
         else:
             print("BE PATIENT!@#~!#!@#$~!`1111")
 
+    def reload_handler(self, signal, frame):
+        """ Handle SIGHUP """
+        if self.quitting:
+            return
+        print("Caught SIGHUP, reloading config")
+        self.reload()
+
     def stop_threads(self):
         """Stops all threads and waits for them to quit"""
         print("Stopping threads")
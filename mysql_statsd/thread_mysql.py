@@ -1,9 +1,15 @@
-import time
+import random
 import re
+import time
 import MySQLdb as mdb
 import traceback
+import distutils.util
+from check_scheduler import CheckScheduler
 from thread_base import ThreadBase
-from preprocessors import (MysqlPreprocessor, InnoDBPreprocessor, ColumnsPreprocessor)
+from whitelist import MetricWhitelist
+from preprocessors import (MysqlPreprocessor, InnoDBTablePreprocessor, ColumnsPreprocessor,
+                           InnoDBMetricsPreprocessor, InnoDBBufferPoolPreprocessor, PagedTablePreprocessor,
+                           DigestPreprocessor)
 
 
 class ThreadMySQLMaxReconnectException(Exception):
@@ -15,28 +21,63 @@ class ThreadMySQL(ThreadBase):
     is_running = True
     connection = None
     recovery_attempt = 0
-    reconnect_delay = 5
-    stats_checks = {}
-    check_lastrun = {}
+    connection_attempt = 0
+    reconnect_at = 0
+    # Client errors meaning the connection is lost: server gone away, lost
+    # connection during query and lost connection to server
+    connection_lost_errors = (2006, 2013, 2055)
+    # Settings that require a new connection when they change on reload
+    connection_settings = ('host', 'port', 'socket', 'username', 'password', 'connect_timeout', 'read_timeout')
+    # Queries returning all status or variables that can be narrowed by the whitelist
+    _NARROWABLE_QUERY = re.compile(r'^\s*SHOW\s+(GLOBAL\s+|SESSION\s+)?(STATUS|VARIABLES)\s*$', re.I)
+    _VARIABLE_NAME = re.compile(r'^[a-z0-9_%]+$')
+    # Checks reading per table or index statistics a page per poll
+    paged_checks = ('tables', 'indexes')
+    # Checks whose metrics are named after another check, so the structured
+    # InnoDB checks send the same innodb.* metrics as SHOW ENGINE INNODB STATUS
+    check_namespaces = {
+        'innodb_metrics': 'innodb',
+        'innodb_buffer_pool': 'innodb',
+    }
 
     def __init__(self, *args, **kwargs):
         super(ThreadMySQL, self).__init__(*args, **kwargs)
         self.processor_class_mysql = MysqlPreprocessor()
-        self.processor_class_inno = InnoDBPreprocessor()
         self.processor_class_columns = ColumnsPreprocessor()
+        self.processor_class_inno_metrics = InnoDBMetricsPreprocessor()
+        self.processor_class_inno_buffer_pool = InnoDBBufferPoolPreprocessor()
 
     def configure(self, config_dict):
+        self.name = config_dict.get('mysql').get('name', 'mysql')
         self.host = config_dict.get('mysql').get('host', 'localhost')
-        self.port = config_dict.get('mysql').get('port', 3306)
+        self.port = int(config_dict.get('mysql').get('port', 3306))
         self.socket = config_dict.get('mysql').get('socket', None)
 
         self.username = config_dict.get('mysql').get('username', 'root')
         self.password = config_dict.get('mysql').get('password', '')
 
         self.max_reconnect = int(config_dict.get('mysql').get('max_reconnect', 5))
+        # Reconnects back off exponentially from reconnect_delay up to max_reconnect_delay ms
+        self.reconnect_delay = int(config_dict.get('mysql').get('reconnect_delay', 1000))/1000.0
+        self.max_reconnect_delay = int(config_dict.get('mysql').get('max_reconnect_delay', 60000))/1000.0
+        # Timeouts in seconds, 0 leaves them at the client library default
+        self.connect_timeout = int(config_dict.get('mysql').get('connect_timeout', 5))
+        self.read_timeout = int(config_dict.get('mysql').get('read_timeout', 30))
         self.max_recovery = int(config_dict.get('mysql').get('max_recovery', 10))
-        
+
+        # Prefix for all metrics of this instance, used when polling multiple instances
+        self.prefix = config_dict.get('mysql').get('prefix', '')
+        if self.prefix:
+            self.prefix += '.'
+
+        # Checks are aligned to multiples of their interval, shifted by up to jitter
+        self.scheduler = CheckScheduler(
+            align=distutils.util.strtobool(config_dict.get('mysql').get('schedule_align', 'true')),
+            jitter=int(config_dict.get('mysql').get('schedule_jitter', 0))/1000.0,
+            max_factor=int(config_dict.get('mysql').get('adaptive_max_factor', 8)))
+
         #Set the stats checks for MySQL
+        self.stats_checks = {}
         for stats_type in config_dict.get('mysql').get('stats_types').split(','):
             if config_dict.get('mysql').get('query_'+stats_type) and \
                     config_dict.get('mysql').get('interval_'+stats_type):
@@ -45,41 +86,178 @@ class ThreadMySQL(ThreadBase):
                     'query': config_dict.get('mysql').get('query_'+stats_type),
                     'interval': config_dict.get('mysql').get('interval_'+stats_type)
                 }
-                self.check_lastrun[stats_type] = (time.time()*1000)
-
+                self.scheduler.add(stats_type, float(self.stats_checks[stats_type]['interval'])/1000.0)
+
+        # Paged checks keep their position and the counters of every table
+        self.processor_class_paged = {}
+        for stats_type in self.stats_checks:
+            if stats_type in self.paged_checks:
+                gauges = config_dict.get('mysql').get('gauges_'+stats_type)
+                self.processor_class_paged[stats_type] = PagedTablePreprocessor(
+                    page_size=int(config_dict.get('mysql').get('page_size_'+stats_type, 1000)),
+                    max_keys=int(config_dict.get('mysql').get('max_keys_'+stats_type, 0)),
+                    gauges=None if gauges is None else [gauge.strip().lower() for gauge in gauges.split(',')])
+
+        # The digests check keeps the counters of every digest to compute deltas
+        self.processor_class_digests = DigestPreprocessor(
+            top=int(config_dict.get('mysql').get('top_digests', 20)),
+            order=config_dict.get('mysql').get('order_digests', 'latency'))
+
+        # Longest we sleep waiting for the next check, keeps stop() responsive
         self.sleep_interval = int(config_dict.get('mysql').get('sleep_interval', 500))/1000.0
 
+        # The intervals of adaptive_checks are stretched while their query takes
+        # longer than adaptive_query_time ms or a gauge is above its threshold
+        self.adaptive_checks = self.check_list(config_dict.get('mysql').get('adaptive_checks', ''))
+        self.adaptive_query_time = int(config_dict.get('mysql').get('adaptive_query_time', 0))/1000.0
+        self.load_thresholds, self.load_keys = self.parse_thresholds(
+            config_dict.get('mysql').get('adaptive_thresholds', ''))
+        # Latest value of every gauge with a threshold and when it expires,
+        # shared by the pollers of an instance
+        self.load = {}
+
+        # Once the checks of a cycle took cycle_budget ms, the low_priority checks
+        # that are still due are deferred
+        self.cycle_budget = int(config_dict.get('mysql').get('cycle_budget', 0))/1000.0
+        self.low_priority = self.check_list(config_dict.get('mysql').get('low_priority', ''))
+        self.deferrals = {}
+
+        # Namespace of the metrics about the collector itself, empty disables them
+        self.collector_prefix = config_dict.get('mysql').get('collector_prefix', 'collector')
+        self.collector_keys = {}
+        self.query_time = {}
+        # Running totals, shared by the pollers of an instance in evented mode
+        self.totals = dict(reconnects=0, errors=0)
+
         #Which metrics do we allow to be sent to the backend?
         self.metrics = config_dict.get('metrics')
+        self.whitelist = MetricWhitelist(self.metrics, prefix=self.prefix)
 
-        return self.host, self.port, self.sleep_interval
+        # Raw results of every check are written to this CaptureWriter, if any
+        self.recorder = config_dict.get('recorder')
 
-    def setup_connection(self):
-        connection_attempt = 0
+        # Only parse the sections of SHOW ENGINE INNODB STATUS with whitelisted
+        # metrics, and at most max_lines_innodb lines of a section (0 is unlimited)
+        names, wildcards = self.whitelist.names('innodb')
+        names += self.load_keys.get('innodb', {}).keys()
+        self.processor_class_inno = InnoDBTablePreprocessor(
+            metrics=names + [wildcard.replace('%', '*') for wildcard in wildcards],
+            max_section_lines=int(config_dict.get('mysql').get('max_lines_innodb', 0)))
 
-        while self.max_reconnect == 0 or connection_attempt < self.max_reconnect:
-            try:
-                if self.socket:
-                    self.connection = mdb.connect(user=self.username, unix_socket=self.socket, passwd=self.password)
-                else:
-                    self.connection = mdb.connect(host=self.host, user=self.username, port=self.port, passwd=self.password)
+        # Only fetch the whitelisted status and variables
+        if distutils.util.strtobool(config_dict.get('mysql').get('narrow_queries', 'true')):
+            for check_type, check in self.stats_checks.items():
+                check['query'] = self.narrow_query(check_type, check['query'])
 
-                return self.connection
-            except Exception:
-                pass
+        return self.host, self.port, self.sleep_interval
 
-            # If we got here, connection failed
-            connection_attempt += 1
-            print('Attempting reconnect #{0}...'.format(connection_attempt))
-            time.sleep(self.reconnect_delay)
-        
-        # If we get out of the while loop, we've passed max_reconnect
-        raise ThreadMySQLMaxReconnectException
+    @staticmethod
+    def check_list(value):
+        return set(check.strip() for check in value.split(',') if check.strip())
 
+    @staticmethod
+    def parse_thresholds(value):
+        """
+        Parses adaptive thresholds like status.threads_running:50, returns the
+        thresholds by metric and per check type the metric of every key
+        """
+        thresholds = {}
+        keys = {}
+        for threshold in value.split(','):
+            if not threshold.strip():
+                continue
+            name, sep, limit = threshold.strip().lower().partition(':')
+            check_type, dot, key = name.partition('.')
+            if not key or not re.match(r'^-?[0-9.]+$', limit.strip()):
+                raise ValueError("Invalid adaptive threshold {0}, use <check>.<metric>:<value>".format(threshold))
+            thresholds[name] = float(limit)
+            keys.setdefault(check_type, {})[key] = name
+        return thresholds, keys
+
+    def narrow_query(self, check_type, query):
+        """
+        Turns SHOW GLOBAL STATUS or VARIABLES into a query that only returns
+        the variables whitelisted for the check, f.e.:
+        SHOW GLOBAL STATUS WHERE Variable_name IN ('com_select', 'questions') OR Variable_name LIKE 'innodb_%'
+        Other queries are returned as is.
+        """
+        if not self._NARROWABLE_QUERY.match(query):
+            return query
+
+        namespace = self.check_namespaces.get(check_type, check_type)
+        names, wildcards = self.whitelist.names(namespace)
+        # The gauges with an adaptive threshold are needed as well
+        names = sorted(set(names).union(self.load_keys.get(namespace, ())))
+        if not names and not wildcards:
+            return query
+        if not all(self._VARIABLE_NAME.match(name) for name in names + wildcards):
+            return query
+
+        conditions = []
+        if names:
+            conditions.append("Variable_name IN ({0})".format(", ".join("'{0}'".format(name) for name in names)))
+        conditions.extend("Variable_name LIKE '{0}'".format(wildcard) for wildcard in wildcards)
+        return "{0} WHERE {1}".format(query.strip(), " OR ".join(conditions))
+
+    def connect(self):
+        kwargs = dict(user=self.username, passwd=self.password)
+        if self.socket:
+            kwargs['unix_socket'] = self.socket
+        else:
+            kwargs.update(host=self.host, port=self.port)
+        if self.connect_timeout:
+            kwargs['connect_timeout'] = self.connect_timeout
+        if self.read_timeout:
+            kwargs['read_timeout'] = self.read_timeout
+        return mdb.connect(**kwargs)
+
+    def backoff(self, attempt):
+        """
+        Seconds to wait before the next connection attempt: doubles on every
+        attempt up to max_reconnect_delay, randomised between half and all of
+        that so a fleet doesn't reconnect all at once after a failover.
+        """
+        delay = min(self.max_reconnect_delay, self.reconnect_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
 
-    def stop(self):
-        """ Stop running this thread and close connection """
-        self.is_running = False
+    def setup_connection(self):
+        """
+        Makes a single connection attempt, returns None when it failed.
+        The next attempt may only be made after the backoff, see reconnect_at.
+        """
+        try:
+            self.connection = self.connect()
+            self.connection_attempt = 0
+            self.reconnect_at = 0
+            return self.connection
+        except Exception as ex:
+            error = ex
+
+        # If we got here, connection failed
+        self.connection_attempt += 1
+        self.totals['reconnects'] += 1
+        # Back off before giving up as well, engines polling many instances
+        # may catch this and keep on polling the others
+        delay = self.backoff(self.connection_attempt)
+        self.reconnect_at = time.time() + delay
+        if self.max_reconnect and self.connection_attempt >= self.max_reconnect:
+            # We've passed max_reconnect
+            raise ThreadMySQLMaxReconnectException(
+                "Giving up on {0} after {1} failed connection attempts".format(self.name, self.connection_attempt))
+
+        print('Connecting to {0} failed: {1!r}, attempting reconnect #{2} in {3:.1f}s...'.format(
+            self.name, error, self.connection_attempt, delay))
+        return None
+
+    def ensure_connection(self):
+        """ Returns whether there is a connection, connecting when the backoff allows it """
+        if self.connection and self.connection.open:
+            return True
+        if time.time() < self.reconnect_at:
+            return False
+        return self.setup_connection() is not None
+
+    def close(self):
         try:
             if self.connection:
                 self.connection.close()
@@ -87,49 +265,233 @@ class ThreadMySQL(ThreadBase):
             """ Ignore exceptions thrown during closing connection """
             pass
 
+    def stop(self):
+        """ Stop running this thread and close connection """
+        self.is_running = False
+        self.close()
+
+    def apply_config(self):
+        """
+        Applies a reloaded config without losing state: the connection is
+        kept unless its settings changed, checks whose interval didn't change
+        keep their due time and the paged and digest checks keep the counters
+        their deltas are computed against.
+        """
+        previous = super(ThreadMySQL, self).apply_config()
+        if previous is None:
+            return
+
+        self.scheduler.keep(previous['scheduler'])
+        for check_type, processor in self.processor_class_paged.items():
+            kept = previous['processor_class_paged'].get(check_type)
+            if kept is not None:
+                kept.page_size, kept.max_keys, kept.gauges = processor.page_size, processor.max_keys, processor.gauges
+                self.processor_class_paged[check_type] = kept
+        digests = previous['processor_class_digests']
+        digests.top, digests.order = self.processor_class_digests.top, self.processor_class_digests.order
+        self.processor_class_digests = digests
+        self.query_time = previous['query_time']
+        self.totals = previous['totals']
+        self.load = previous['load']
+        self.deferrals = previous['deferrals']
+
+        if any(previous[name] != getattr(self, name) for name in self.connection_settings):
+            print("Connection settings of {0} changed, reconnecting".format(self.name))
+            self.close()
+            self.connection = None
+            self.connection_attempt = 0
+            self.reconnect_at = 0
+
+    def sleep_time(self, now, max_sleep=None):
+        """ Seconds until a check is due and, when disconnected, we may reconnect """
+        sleep_time = self.scheduler.sleep_time(now)
+        if sleep_time is not None and self.reconnect_at > now and \
+                not (self.connection and self.connection.open):
+            sleep_time = max(sleep_time, self.reconnect_at - now)
+        if max_sleep is not None:
+            sleep_time = max_sleep if sleep_time is None else min(sleep_time, max_sleep)
+        return sleep_time
+
+    def has_due_checks(self):
+        return self.sleep_time(time.time()) == 0
+
+    def fetch(self, check_type):
+        """ Run the query of a check, returns the column names and all rows """
+        query = self.stats_checks[check_type]['query']
+        if check_type in self.processor_class_paged:
+            query = self.processor_class_paged[check_type].query(query)
+
+        started = time.time()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(query)
+            column_names = [i[0] for i in cursor.description]
+            rows = cursor.fetchall()
+        finally:
+            # A query that timed out counts as a slow one for adaptive intervals
+            self.query_time[check_type] = time.time() - started
+        return column_names, rows
+
+    def process_result(self, check_type, column_names, rows, timestamp=None):
+        """
+        Pre process rows
+        This transforms innodb status to a row like structure
+        This allows pluggable modules,
+        preprocessors should return list of key value tuples, e.g.:
+        [('my_key', '1'), (my_counter, '2'), ('another_metric', '666')]
+
+        All whitelisted metrics of the check are queued as a single item.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        row_count = len(rows)
+        parse_started = time.time()
+        rows = self._preprocess(check_type, column_names, rows)
+        parse_time = time.time() - parse_started
+
+        # Only allow the whitelisted metrics to be sent off to Statsd
+        samples = []
+        namespace = self.check_namespaces.get(check_type, check_type)
+        whitelisted = self.whitelist.cache(namespace)
+        for key, value in rows:
+            try:
+                entry = whitelisted[key]
+            except KeyError:
+                entry = self.whitelist.resolve(namespace, key)
+
+            if entry is not None:
+                metric_key, metric_type = entry
+                samples.append((metric_key, value, metric_type))
+
+        watched = self.load_keys.get(namespace)
+        if watched:
+            self.record_load(check_type, watched, rows)
+
+        if self.collector_prefix:
+            samples.extend(self.collector_samples(check_type, row_count, len(rows) - len(samples), parse_time))
+
+        if samples:
+            self.queue.put((timestamp, samples))
+
+    def record_load(self, check_type, watched, rows):
+        """
+        Remember the latest value of the gauges with an adaptive threshold.
+        A value expires one interval after the check is due to run again, so
+        a gauge the check stopped returning doesn't keep intervals stretched.
+        """
+        interval = self.scheduler.interval(check_type) if check_type in self.scheduler.intervals else 0
+        expires = time.time() + 2 * interval
+        for key, value in rows:
+            name = watched.get(key.lower())
+            if name is None:
+                continue
+            try:
+                self.load[name] = (float(value), expires)
+            except (TypeError, ValueError):
+                pass
+
+    def overloaded(self, check_type):
+        """ Whether the query of a check took too long or a current gauge is above its threshold """
+        if self.adaptive_query_time and self.query_time.get(check_type, 0) > self.adaptive_query_time:
+            return True
+        now = time.time()
+        for name, threshold in self.load_thresholds.iteritems():
+            value, expires = self.load.get(name, (0, 0))
+            if expires > now and value > threshold:
+                return True
+        return False
+
+    def adapt_interval(self, check_type):
+        """ Stretch or shrink the interval of an adaptive check, before it's rescheduled """
+        if check_type not in self.adaptive_checks:
+            return
+        if self.scheduler.stretch(check_type, self.overloaded(check_type)):
+            print("Interval of {0} check {1} is now {2:.1f}s".format(
+                self.name, check_type, self.scheduler.interval(check_type)))
+
+    def over_budget(self, check_type, due, started, now):
+        """
+        Whether a low priority check has to wait because the checks of the
+        cycle started at started took longer than cycle_budget. A check is
+        never deferred by more than its interval.
+        """
+        if not self.cycle_budget or check_type not in self.low_priority:
+            return False
+        return now - started > self.cycle_budget and now - due < self.scheduler.interval(check_type)
+
+    def get_collector_keys(self, check_type):
+        keys = self.collector_keys.get(check_type)
+        if keys is None:
+            base = self.prefix + self.collector_prefix + '.'
+            keys = self.collector_keys[check_type] = dict(
+                (name, base + check_type + '.' + name)
+                for name in ('query_time', 'parse_time', 'lateness', 'rows', 'dropped', 'truncated',
+                             'interval', 'deferred'))
+            keys['reconnects'] = base + 'reconnects'
+            keys['errors'] = base + 'errors'
+        return keys
+
+    def collector_samples(self, check_type, row_count, dropped, parse_time):
+        """
+        Metrics about the cost of running a check: query, parse and lateness
+        times in ms, the number of rows returned, metrics not whitelisted and
+        for SHOW ENGINE INNODB STATUS the lines left out by max_lines_innodb.
+        Also the interval in effect in ms and, with a cycle budget, how often
+        the check was deferred. Reconnects, errors and deferrals are sent as
+        deltas of their running totals.
+        """
+        keys = self.get_collector_keys(check_type)
+        samples = [
+            (keys['parse_time'], parse_time * 1000, 't'),
+            (keys['rows'], row_count, 'g'),
+            (keys['dropped'], dropped, 'g'),
+            (keys['reconnects'], self.totals['reconnects'], 'd'),
+            (keys['errors'], self.totals['errors'], 'd'),
+        ]
+        query_time = self.query_time.get(check_type)
+        if query_time is not None:
+            samples.append((keys['query_time'], query_time * 1000, 't'))
+        lateness = self.scheduler.lateness.get(check_type)
+        if lateness and lateness['runs']:
+            samples.append((keys['lateness'], lateness['last'] * 1000, 't'))
+        if check_type in self.scheduler.intervals:
+            samples.append((keys['interval'], self.scheduler.interval(check_type) * 1000, 'g'))
+        if self.cycle_budget and check_type in self.low_priority:
+            samples.append((keys['deferred'], self.deferrals.get(check_type, 0), 'd'))
+        if check_type == 'innodb':
+            samples.append((keys['truncated'], self.processor_class_inno.truncated, 'g'))
+        return samples
+
     def _run(self):
-        for check_type in self.stats_checks:
-            """
-            Only run a check if we exceeded the query threshold.
-            This is especially important for SHOW INNODB ENGINE
-            which locks the engine for a short period of time
-            """
-            time_now = time.time()*1000
-            check_threshold = float(self.stats_checks[check_type]['interval'])
-            check_lastrun = self.check_lastrun[check_type]
-            if (time_now - check_lastrun) > check_threshold:
-                cursor = self.connection.cursor()
-                cursor.execute(self.stats_checks[check_type]['query'])
-                column_names = [i[0] for i in cursor.description]
-
-                """
-                Pre process rows
-                This transforms innodb status to a row like structure
-                This allows pluggable modules,
-                preprocessors should return list of key value tuples, e.g.:
-                [('my_key', '1'), (my_counter, '2'), ('another_metric', '666')]
-                """
-                rows = self._preprocess(check_type, column_names, cursor.fetchall())
-                for key, value in rows:
-                    key = key.lower()
-                    metric_key = check_type + "." + key
-
-                    # Support multiple bufferpools in metrics (or rather: ignore them)
-                    # Bascially bufferpool_* whitelists metrics for *all* bufferpools
-                    if key.startswith('bufferpool_'):
-                        # Rewrite the metric key to the whitelisted wildcard key
-                        whitelist_key = "{0}.{1}".format(check_type, re.sub(r'(.*bufferpool_)\d+(\..+)', r'\1*\2', key))
-
-                        # Only allow the whitelisted metrics to be sent off to Statsd
-                        if whitelist_key in self.metrics:
-                            metric_type = self.metrics.get(whitelist_key)
-                            self.queue.put((metric_key, value, metric_type))
-                    else:
-                        # Only allow the whitelisted metrics to be sent off to Statsd
-                        if metric_key in self.metrics:
-                            metric_type = self.metrics.get(metric_key)
-                            self.queue.put((metric_key, value, metric_type))
-                self.check_lastrun[check_type] = time_now
+        """
+        Run the checks that are due, in order of their due time.
+        A check never runs more often than its interval,
+        this is especially important for SHOW INNODB ENGINE
+        which locks the engine for a short period of time.
+        Low priority checks that are due once the cycle used up its
+        budget are deferred until sleep_interval later.
+        """
+        now = time.time()
+        while True:
+            due_check = self.scheduler.pop_due(now)
+            if due_check is None:
+                break
+
+            check_type, due = due_check
+            time_now = time.time()
+            if self.over_budget(check_type, due, now, time_now):
+                self.deferrals[check_type] = self.deferrals.get(check_type, 0) + 1
+                self.scheduler.defer(check_type, due, time_now + self.sleep_interval)
+                continue
+            self.scheduler.record(check_type, due, time_now)
+            try:
+                column_names, rows = self.fetch(check_type)
+                if self.recorder is not None:
+                    self.recorder.write(time_now, self.name, check_type, column_names, rows)
+                self.process_result(check_type, column_names, rows, time_now)
+            finally:
+                self.adapt_interval(check_type)
+                self.scheduler.reschedule(check_type, due, time.time())
 
     def _preprocess(self, check_type, column_names, rows):
         """
@@ -144,6 +506,18 @@ class ThreadMySQL(ThreadBase):
         if check_type == 'slave':
             executing_class = self.processor_class_columns
             extra_args = (column_names,)
+        if check_type == 'innodb_metrics':
+            executing_class = self.processor_class_inno_metrics
+            extra_args = (column_names,)
+        if check_type == 'innodb_buffer_pool':
+            executing_class = self.processor_class_inno_buffer_pool
+            extra_args = (column_names,)
+        if check_type in self.processor_class_paged:
+            executing_class = self.processor_class_paged[check_type]
+            extra_args = (column_names,)
+        if check_type == 'digests':
+            executing_class = self.processor_class_digests
+            extra_args = (column_names,)
 
         return executing_class.process(rows, *extra_args)
 
@@ -154,27 +528,38 @@ class ThreadMySQL(ThreadBase):
             raise
 
         self.recovery_attempt += 1
+        self.totals['errors'] += 1
         print("Ignoring database error:")
         traceback.print_exc()
 
-        # Server gone away requires we reset the connection.
-        if ex.args[0] == 2006:
-            self.connection.close()
+        # A lost connection requires we reset it. The first reconnect is made
+        # at a random moment within reconnect_delay, so a fleet that lost its
+        # connections at the same time (f.e. a failover) doesn't all reconnect at once.
+        if ex.args and ex.args[0] in self.connection_lost_errors:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.reconnect_at = time.time() + random.uniform(0, self.reconnect_delay)
+
+    def poll(self):
+        """ Run all checks that are due, (re)connecting when needed """
+        if self.new_config is not None:
+            self.apply_config()
+        if not self.ensure_connection():
+            return
+
+        try:
+            self._run()
+            self.recovery_attempt = 0
+        except mdb.DatabaseError as ex:
+            self.recover_errors(ex)
 
     def run(self):
         """ Run forever """
-        if not self.connection:
-            """ Initial connection setup """
-            self.setup_connection()
-
         while self.is_running:
-            if not self.connection.open:
-                self.setup_connection()
-
-            try:
-                self._run()
-                self.recovery_attempt = 0
-            except mdb.DatabaseError as ex:
-                self.recover_errors(ex)
+            self.poll()
+            # Sleep until the next check is due
+            time.sleep(self.sleep_time(time.time(), self.sleep_interval))
 
-            time.sleep(self.sleep_interval)
+        print(self.scheduler.report())
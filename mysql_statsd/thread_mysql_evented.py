@@ -0,0 +1,154 @@
+import time
+import MySQLdb as mdb
+from event_loop import EventLoop
+from thread_base import ThreadBase
+from thread_mysql import ThreadMySQL, ThreadMySQLMaxReconnectException
+
+
+class ThreadMySQLEvented(ThreadBase):
+    """
+    Runs every check of every instance as a task on a single event loop.
+    Each check has its own connection and its query is offloaded to a worker,
+    so a slow SHOW ENGINE INNODB STATUS doesn't hold back any other check.
+    That makes a connection (and reconnect backoff) per check per instance.
+    Preprocessing and whitelisting happen on the loop, just like in ThreadMySQL.
+    The pollers of an instance share the gauges adaptive intervals look at
+    and their reconnect and error totals, sent under one key per instance.
+    """
+    def configure(self, config_dict):
+        self.loop = EventLoop(workers=int(config_dict.get('pool_size', 4)))
+
+        # One poller per check of every instance, their threads are never started
+        self.checks = []
+        self.loads = {}
+        self.totals = {}
+        for (name, check_type), poller_config in self.poller_configs(config_dict):
+            poller = ThreadMySQL(queue=self.queue, **poller_config)
+            poller.load = self.loads.setdefault(name, {})
+            poller.totals = self.totals.setdefault(name, poller.totals)
+            if check_type in poller.stats_checks:
+                self.checks.append((poller, check_type))
+
+    @staticmethod
+    def poller_configs(config_dict):
+        """ Returns ((instance name, check), poller config) for every check of every instance """
+        configs = []
+        for instance_config in config_dict.get('instances'):
+            for check_type in instance_config.get('mysql').get('stats_types').split(','):
+                mysql_config = dict(instance_config.get('mysql'), stats_types=check_type)
+                configs.append(((mysql_config.get('name', 'mysql'), check_type),
+                                dict(mysql=mysql_config, metrics=instance_config.get('metrics'),
+                                     recorder=instance_config.get('recorder'))))
+        return configs
+
+    def reconfigure(self, config_dict):
+        self.loop.call_threadsafe(self.apply_config, config_dict)
+
+    def apply_config(self, config_dict):
+        """
+        Runs on the loop. Checks are matched by instance name and check type,
+        existing pollers keep their connection and apply the new config
+        before their next run. Removed checks stop at their next run.
+        The config of every check is checked before anything changes, when
+        one is invalid the previous config is kept as a whole.
+        """
+        current = dict(((poller.name, check_type), (poller, check_type)) for poller, check_type in self.checks)
+        checks = []
+        added = []
+        reconfigured = []
+        try:
+            for key, poller_config in self.poller_configs(config_dict):
+                # Also checks the config of the checks that are kept
+                poller = ThreadMySQL(queue=self.queue, **poller_config)
+                check = current.get(key)
+                if check is not None:
+                    reconfigured.append((check[0], poller_config))
+                    checks.append(check)
+                elif key[1] in poller.stats_checks:
+                    added.append((poller, key[1]))
+                    checks.append((poller, key[1]))
+        except Exception as ex:
+            print("Reloading the config of {0} failed, keeping the previous one: {1!r}".format(self.getName(), ex))
+            return
+
+        for poller, poller_config in reconfigured:
+            poller.reconfigure(poller_config)
+        for poller, check_type in added:
+            poller.load = self.loads.setdefault(poller.name, {})
+            poller.totals = self.totals.setdefault(poller.name, poller.totals)
+            self.schedule(poller, check_type)
+        self.checks = checks
+
+    def query(self, poller, check_type):
+        """ Runs on an event loop worker """
+        # Skip this run while waiting to reconnect, other checks aren't held up
+        if not poller.ensure_connection():
+            return None
+
+        try:
+            result = poller.fetch(check_type)
+            poller.recovery_attempt = 0
+            return result
+        except mdb.DatabaseError as ex:
+            poller.recover_errors(ex)
+
+    def schedule(self, poller, check_type):
+        self.loop.call_at(poller.scheduler.next_time(), self.run_check, poller, check_type)
+
+    def run_check(self, poller, check_type):
+        if (poller, check_type) not in self.checks:
+            # Removed by a reload
+            poller.stop()
+            return
+        if poller.new_config is not None:
+            poller.apply_config()
+            if check_type not in poller.stats_checks:
+                self.checks.remove((poller, check_type))
+                poller.stop()
+                return
+
+        due_check = poller.scheduler.pop_due(time.time())
+        if due_check is None:
+            # A reload made the check due later
+            self.schedule(poller, check_type)
+            return
+        check_type, due = due_check
+        poller.scheduler.record(check_type, due, time.time())
+
+        def completed(result, error):
+            if isinstance(error, ThreadMySQLMaxReconnectException):
+                # Stop running the check until a reload adds it again
+                print("{0}, stopping check {1}".format(error, check_type))
+                if (poller, check_type) in self.checks:
+                    self.checks.remove((poller, check_type))
+                poller.stop()
+                return
+            if error is not None:
+                print("Check {0} of {1} failed: {2!r}".format(check_type, poller.name, error))
+            elif result is not None:
+                column_names, rows = result
+                timestamp = time.time()
+                if poller.recorder is not None:
+                    poller.recorder.write(timestamp, poller.name, check_type, column_names, rows)
+                poller.process_result(check_type, column_names, rows, timestamp)
+            # Runs that were missed while the check took too long are skipped
+            poller.adapt_interval(check_type)
+            poller.scheduler.reschedule(check_type, due, time.time())
+            self.schedule(poller, check_type)
+
+        self.loop.run_in_worker(self.query, (poller, check_type), completed)
+
+    def stop(self):
+        self.loop.stop()
+
+    def run(self):
+        print("Polling {0} checks of {1} instances, using a connection per check".format(
+            len(self.checks), len(self.loads)))
+        for poller, check_type in self.checks:
+            self.schedule(poller, check_type)
+
+        self.loop.run()
+
+        for poller, check_type in self.checks:
+            poller.stop()
+            print("{0} {1}".format(poller.name, poller.scheduler.report()))
@@ -0,0 +1,151 @@
+import Queue
+import threading
+import time
+import traceback
+from thread_base import ThreadBase
+from thread_mysql import ThreadMySQL, ThreadMySQLMaxReconnectException
+
+
+class ThreadMySQLPoolWorker(threading.Thread):
+    """ Polls the MySQL instances handed to it by the pool """
+    def __init__(self, pool):
+        threading.Thread.__init__(self)
+        self.pool = pool
+
+    def run(self):
+        while True:
+            instance = self.pool.work.get()
+            # None is the signal to quit
+            if instance is None:
+                return
+
+            try:
+                instance.poll()
+            except ThreadMySQLMaxReconnectException as ex:
+                print(ex)
+                self.pool.give_up(instance)
+            except Exception:
+                print("Polling {0} failed:".format(instance.name))
+                traceback.print_exc()
+            finally:
+                self.pool.release(instance)
+
+
+class ThreadMySQLPool(ThreadBase):
+    """ Polls many MySQL instances with a bounded pool of worker threads """
+    is_running = True
+
+    def configure(self, config_dict):
+        self.pool_size = int(config_dict.get('pool_size', 4))
+        # Longest we sleep waiting for the next check of any instance
+        self.sleep_interval = int(config_dict.get('sleep_interval', 500))/1000.0
+
+        # Instances are only used as pollers, their threads are never started
+        self.instances = [ThreadMySQL(queue=self.queue, **instance_config)
+                          for instance_config in config_dict.get('instances')]
+
+        self.work = Queue.Queue()
+        self.busy = set()
+        # Instances removed by a reload, stopped once they aren't polled anymore
+        self.retired = []
+        self.lock = threading.Lock()
+        self.workers = [ThreadMySQLPoolWorker(self) for i in range(min(self.pool_size, len(self.instances)))]
+
+    def apply_config(self):
+        """
+        Applies a reloaded config: instances are matched by name and keep
+        their connection and state, new instances are added and removed ones
+        stopped. More workers are started when needed, never fewer.
+        The config of every instance is checked before anything changes,
+        when one is invalid the previous config is kept as a whole.
+        """
+        config_dict, self.new_config = self.new_config, None
+        try:
+            pool_size = int(config_dict.get('pool_size', self.pool_size))
+            sleep_interval = int(config_dict.get('sleep_interval', 500))/1000.0
+            current = dict((instance.name, instance) for instance in self.instances)
+            instances = []
+            reconfigured = []
+            for instance_config in config_dict.get('instances'):
+                # Also checks the config of the instances that are kept
+                instance = ThreadMySQL(queue=self.queue, **instance_config)
+                if instance.name in current:
+                    instance = current.pop(instance.name)
+                    reconfigured.append((instance, instance_config))
+                instances.append(instance)
+        except Exception as ex:
+            print("Reloading the config of {0} failed, keeping the previous one: {1!r}".format(self.getName(), ex))
+            return
+
+        self.pool_size, self.sleep_interval = pool_size, sleep_interval
+        for instance, instance_config in reconfigured:
+            instance.reconfigure(instance_config)
+        with self.lock:
+            self.instances = instances
+            self.retired.extend(current.values())
+
+        for i in range(len(self.workers), min(self.pool_size, len(self.instances))):
+            worker = ThreadMySQLPoolWorker(self)
+            worker.start()
+            self.workers.append(worker)
+
+    def give_up(self, instance):
+        """ Stop polling an instance that can't be connected to, until a reload adds it again """
+        with self.lock:
+            if instance in self.instances:
+                self.instances.remove(instance)
+                self.retired.append(instance)
+
+    def release(self, instance):
+        with self.lock:
+            self.busy.discard(instance)
+
+    def dispatch(self):
+        """ Hand every idle instance with due checks to the workers """
+        with self.lock:
+            retired = [instance for instance in self.retired if instance not in self.busy]
+            self.retired = [instance for instance in self.retired if instance in self.busy]
+        for instance in retired:
+            instance.stop()
+
+        for instance in self.instances:
+            with self.lock:
+                if instance in self.busy:
+                    continue
+                # Apply a reloaded config before its due checks are computed
+                if instance.new_config is not None:
+                    instance.apply_config()
+                if not instance.has_due_checks():
+                    continue
+                self.busy.add(instance)
+            self.work.put(instance)
+
+    def sleep_time(self):
+        """ Seconds until the first check of an idle instance is due """
+        now = time.time()
+        with self.lock:
+            idle = [instance for instance in self.instances if instance not in self.busy]
+        return min([instance.sleep_time(now, self.sleep_interval) for instance in idle]
+                   or [self.sleep_interval])
+
+    def stop(self):
+        """ Stop dispatching, the workers and instances are stopped in run """
+        self.is_running = False
+
+    def run(self):
+        for worker in self.workers:
+            worker.start()
+
+        while self.is_running:
+            if self.new_config is not None:
+                self.apply_config()
+            self.dispatch()
+            time.sleep(self.sleep_time())
+
+        for worker in self.workers:
+            self.work.put(None)
+        for instance in self.retired:
+            instance.stop()
+        for instance in self.instances:
+            instance.stop()
+            print("{0}:\n{1}".format(instance.name, instance.scheduler.report()))
@@ -0,0 +1,173 @@
+import BaseHTTPServer
+import Queue
+import re
+import SocketServer
+import threading
+import time
+from thread_base import ThreadBase
+
+
+class PrometheusHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """ Serves the exposition rendered by the ThreadPrometheus owning the server """
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        # Rebuilt as a whole after every poll, so this is always a complete one
+        exposition = self.server.exporter.exposition
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(exposition)))
+        self.end_headers()
+        self.wfile.write(exposition)
+
+    def log_message(self, format, *args):
+        """ Don't log every scrape """
+        pass
+
+
+class PrometheusServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ThreadPrometheus(ThreadBase):
+    """
+    Serves the latest value of every metric on /metrics for Prometheus.
+    The text exposition is rendered once per received check result, a scrape
+    only writes out the rendered string.
+
+    The prefix of a [mysql:<name>] instance becomes an instance label, so
+    the metrics of all instances share their names. Metrics that weren't
+    updated for max_age seconds, like those of tables or digests that went
+    quiet, are no longer served.
+    """
+    _INVALID_CHARS = re.compile(r'[^a-zA-Z0-9_:]')
+
+    # Cumulative values like com_select are counters for Prometheus, which
+    # calculates deltas and rates itself
+    metric_types = {
+        'g': 'gauge',
+        'd': 'counter',
+        'p': 'counter',
+    }
+
+    def configure(self, config):
+        self.host = config.get('host', '')
+        self.port = int(config.get('port', 9104))
+        self.prefix = config.get('prefix', 'mysql')
+        self.max_age = int(config.get('max_age', 300000))/1000.0
+        # (metric prefix, instance name) of every instance, longest prefix first
+        self.instances = sorted(config.get('instances', []), key=lambda instance: -len(instance[0]))
+        # Per key its family, type, series and value and when it was updated
+        self.samples = {}
+        self.rendered_keys = {}
+        self.exposition = ''
+        self.server = None
+
+    def reconfigure(self, config):
+        super(ThreadPrometheus, self).reconfigure(config)
+        # Wake up the thread in case it's waiting for metrics
+        self.queue.put((time.time(), []))
+
+    def apply_config(self):
+        """
+        Applies a reloaded config, the server keeps listening on the same
+        address and serving the latest exposition until the next poll.
+        """
+        previous = super(ThreadPrometheus, self).apply_config()
+        if previous is None:
+            return
+        self.server = previous['server']
+        self.exposition = previous['exposition']
+        if (self.host, self.port) != (previous['host'], previous['port']):
+            print("Prometheus keeps listening on port {0}, restart to change it".format(previous['port']))
+            self.host, self.port = previous['host'], previous['port']
+        # Metric names only change with the prefix and instances
+        if (self.prefix, self.instances) == (previous['prefix'], previous['instances']):
+            self.samples, self.rendered_keys = previous['samples'], previous['rendered_keys']
+
+    @staticmethod
+    def label_value(value):
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def metric_header(self, key, metric_type):
+        """
+        Returns the metric family, its type and the series (name and labels)
+        of a key, built once per key
+        """
+        header = self.rendered_keys.get(key)
+        if header is None:
+            metric, labels = key, ''
+            for prefix, instance in self.instances:
+                if key.startswith(prefix + '.'):
+                    metric = key[len(prefix) + 1:]
+                    labels = '{{instance="{0}"}}'.format(self.label_value(instance))
+                    break
+            name = self._INVALID_CHARS.sub('_', self.prefix + '_' + metric if self.prefix else metric)
+            header = self.rendered_keys[key] = (
+                name, self.metric_types.get(metric_type, 'untyped'), name + labels + ' ')
+        return header
+
+    def update(self, batch):
+        (timestamp, samples) = batch
+        now = time.time()
+        for key, value, metric_type in samples:
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                continue
+            self.samples[key] = self.metric_header(key, metric_type) + (repr(value), now)
+
+    def render(self):
+        """
+        Renders every family with a single # TYPE line. Metrics not updated
+        within max_age are forgotten. Of keys that end up as the same series
+        after replacing invalid characters the latest updated is served.
+        """
+        expired = time.time() - self.max_age
+        families = {}
+        for key, (family, metric_type, series, value, updated) in self.samples.items():
+            if updated < expired:
+                del self.samples[key]
+                del self.rendered_keys[key]
+                continue
+            lines = families.setdefault(family, (metric_type, {}))[1]
+            if series not in lines or lines[series][0] <= updated:
+                lines[series] = (updated, value)
+
+        parts = []
+        for family in sorted(families):
+            metric_type, lines = families[family]
+            parts.append('# TYPE {0} {1}\n'.format(family, metric_type))
+            parts.extend(series + value + '\n' for series, (updated, value) in sorted(lines.iteritems()))
+        self.exposition = ''.join(parts)
+
+    def stop(self):
+        super(ThreadPrometheus, self).stop()
+        # Wake up the thread in case it's waiting for metrics
+        self.queue.put((time.time(), []))
+
+    def run(self):
+        self.server = PrometheusServer((self.host, self.port), PrometheusHandler)
+        self.server.exporter = self
+        server_thread = threading.Thread(target=self.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+
+        while self.run:
+            if self.new_config is not None:
+                self.apply_config()
+            try:
+                batches = self.queue.get_all(True, None)
+            except Queue.Empty:
+                continue
+            for batch in batches:
+                self.update(batch)
+            self.render()
+
+        self.server.shutdown()
+        self.server.server_close()
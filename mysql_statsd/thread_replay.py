@@ -0,0 +1,74 @@
+import time
+from capture import CaptureReader
+from thread_base import ThreadBase
+from thread_mysql import ThreadMySQL
+
+
+class ThreadReplay(ThreadBase):
+    """
+    Feeds the check results of a capture file through the preprocessors and
+    whitelist of the configured instances, as if they were just fetched, so
+    parsing and sending can be reproduced and benchmarked without MySQL.
+
+    Results are replayed as fast as the senders take them or, in realtime,
+    as far apart as they were recorded. Metrics keep their recorded timestamp.
+    """
+    finished = False
+
+    def configure(self, config_dict):
+        self.path = config_dict.get('path')
+        self.realtime = config_dict.get('realtime', False)
+
+        # Pollers are only used to process results, they never connect
+        self.pollers = {}
+        for instance_config in config_dict.get('instances'):
+            poller = ThreadMySQL(queue=self.queue, **instance_config)
+            self.pollers[poller.name] = poller
+        self.replayed = 0
+        self.skipped = 0
+
+    def wait_until(self, when):
+        while self.run and time.time() < when:
+            time.sleep(max(0, min(0.5, when - time.time())))
+
+    def wait_for_senders(self):
+        """ Don't let the queues of the senders drop results, they should get every one """
+        for queue in [self.queue] + self.queue.mirrors:
+            # Coalesced results aren't lost, Prometheus only serves the latest
+            while queue.policy != 'coalesce' and self.run and queue.max_size and queue.qsize() >= queue.max_size:
+                time.sleep(0.001)
+
+    def wait_for_drain(self):
+        """ Senders stop without emptying their queue, so only finish once they took every result """
+        for queue in [self.queue] + self.queue.mirrors:
+            while self.run and queue.qsize():
+                time.sleep(0.001)
+
+    def run(self):
+        reader = CaptureReader(self.path)
+        started = time.time()
+        first = None
+        try:
+            for timestamp, instance, check_type, column_names, rows in reader:
+                if not self.run:
+                    break
+                poller = self.pollers.get(instance)
+                if poller is None:
+                    self.skipped += 1
+                    continue
+
+                if first is None:
+                    first = timestamp
+                if self.realtime:
+                    self.wait_until(started + timestamp - first)
+                else:
+                    self.wait_for_senders()
+                poller.process_result(check_type, column_names, rows, timestamp)
+                self.replayed += 1
+        finally:
+            reader.close()
+        self.wait_for_drain()
+
+        print("Replayed {0} check results from {1} in {2:.2f}s, skipped {3} of unknown instances".format(
+            self.replayed, self.path, time.time() - started, self.skipped))
+        self.finished = True
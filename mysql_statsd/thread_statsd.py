@@ -5,6 +5,8 @@ import time
 import socket
 import distutils.util
 from pystatsd import statsd
+from metric_queue import MetricQueue
+from metric_registry import MetricRegistry
 from thread_base import ThreadBase
 
 
@@ -21,11 +23,119 @@ class ThreadGenerateGarbage(ThreadBase):
     def run(self):
         while self.run:
             time.sleep(1)
-            self.queue.put((self.gen_key(), random.randint(0, 1000), 'c'))
+            self.queue.put((time.time(), [(self.gen_key(), random.randint(0, 1000), 'c')]))
+
+
+class BatchClient(object):
+    """
+    Drop-in replacement for the pystatsd client that packs many
+    key:value|type lines into a single UDP datagram of at most mtu bytes.
+    """
+    # IPv4 + UDP header overhead paid for every datagram on the wire
+    header_size = 28
+
+    def __init__(self, host='localhost', port=8125, prefix=None, mtu=1432):
+        self.addr = (socket.gethostbyname(host), int(port))
+        self.prefix = prefix
+        self.mtu = mtu
+        self.udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.keys = {}
+        self.buffer = []
+        self.buffer_size = 0
+        self.buffered_since = None
+
+        self.metrics_sent = 0
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.payload_bytes = 0
+
+    def encode_key(self, stat):
+        """Returns the prefixed 'key:' part for a metric, built only once per key"""
+        key = self.keys.get(stat)
+        if key is None:
+            name = self.prefix + "." + stat if self.prefix else stat
+            key = self.keys[stat] = name.encode('utf-8') + ':'
+        return key
+
+    def timing(self, stat, time, sample_rate=1):
+        self.add(stat, "%f|ms" % time, sample_rate)
+
+    def gauge(self, stat, value, sample_rate=1):
+        self.add(stat, "%f|g" % value, sample_rate)
+
+    def increment(self, stat, sample_rate=1):
+        self.update_stats(stat, 1, sample_rate)
+
+    incr = increment
+
+    def update_stats(self, stat, delta, sample_rate=1):
+        self.add(stat, "%s|c" % delta, sample_rate)
+
+    def add(self, stat, value, sample_rate=1):
+        if sample_rate < 1:
+            if random.random() > sample_rate:
+                return
+            value = "%s|@%s" % (value, sample_rate)
+
+        line = self.encode_key(stat) + value
+        # Flush first if this line (plus separating newline) won't fit anymore
+        if self.buffer and self.buffer_size + len(line) + 1 > self.mtu:
+            self.flush()
+
+        if not self.buffer:
+            self.buffered_since = time.time()
+            self.buffer_size = len(line)
+        else:
+            self.buffer_size += len(line) + 1
+        self.buffer.append(line)
+        self.payload_bytes += len(line)
+        self.metrics_sent += 1
+
+    def flush(self):
+        if not self.buffer:
+            return
+        packet = "\n".join(self.buffer)
+        self.buffer = []
+        self.buffer_size = 0
+        self.buffered_since = None
+        try:
+            self.udp_sock.sendto(packet, self.addr)
+        except socket.error as ex:
+            print("Failed to send statsd packet: {0}".format(ex))
+            return
+        self.packets_sent += 1
+        self.bytes_sent += len(packet)
+
+    def pending_for(self, now):
+        """Seconds the oldest buffered metric has been waiting, 0 if empty"""
+        if self.buffered_since is None:
+            return 0
+        return now - self.buffered_since
+
+    def packets_saved(self):
+        return self.metrics_sent - self.packets_sent
+
+    def bytes_saved(self):
+        """Bytes on the wire saved compared to sending one datagram per metric"""
+        unbatched = self.payload_bytes + self.metrics_sent * self.header_size
+        batched = self.bytes_sent + self.packets_sent * self.header_size
+        return unbatched - batched
+
+    def report(self):
+        return "Sent {0} metrics in {1} packets, saved {2} packets and {3} bytes".format(
+            self.metrics_sent, self.packets_sent, self.packets_saved(), self.bytes_saved())
 
 
 class ThreadStatsd(ThreadBase):
     debug = False
+    batch = False
+    client = None
+    target = None
+    # Types computed against the previous value: d = delta, p = per second rate
+    tracked_types = ('d', 'p')
+    # Types only sent when their value changed, in changes_only mode. StatsD
+    # keeps the last value of a gauge, unlike that of a counter (raw values)
+    change_only_types = ('g',)
 
     def configure(self, config):
         host = config.get('host', 'localhost')
@@ -33,10 +143,53 @@ class ThreadStatsd(ThreadBase):
         prefix = config.get('prefix', 'mysql_statsd')
         if distutils.util.strtobool(config.get('include_hostname', 'mysql_statsd')):
             prefix += "." + socket.gethostname().replace('.', '_')
-        self.client = statsd.Client(host, port, prefix=prefix)
+
+        self.batch = distutils.util.strtobool(config.get('batch', 'false'))
+        mtu = int(config.get('batch_mtu', 1432)) if self.batch else None
+        self.batch_delay = int(config.get('batch_delay', 50))/1000.0
+
+        # A reload only replaces the client when it sends elsewhere or differently
+        target = (host, port, prefix, mtu)
+        if target != self.target:
+            if self.batch:
+                self.client = BatchClient(host, port, prefix=prefix, mtu=mtu)
+            else:
+                self.client = statsd.Client(host, port, prefix=prefix)
+            self.target = target
+
+        self.registry = MetricRegistry()
+
+        # Only send gauges when they changed or every heartbeat ms
+        self.changes_only = distutils.util.strtobool(config.get('changes_only', 'false'))
+        self.heartbeat = int(config.get('heartbeat', 60000))/1000.0
+        self.last_sent = MetricRegistry()
+        self.suppressed = 0
+
+        # Metrics about the sender itself, sent every collector_interval
+        self.collector_prefix = config.get('collector_prefix', 'collector')
+        self.collector_interval = int(config.get('collector_interval', 10000))/1000.0
+        self.collector_sent = time.time()
+        self.metrics_received = 0
+
+    def reconfigure(self, config):
+        super(ThreadStatsd, self).reconfigure(config)
+        # Wake up the sender in case it's waiting for metrics
+        self.queue.put((time.time(), []))
+
+    def apply_config(self):
+        """ Applies a reloaded config, keeping the values deltas and changes are computed against """
+        # Metrics buffered for the current client go out before it may be replaced
+        self.flush(force=True)
+        previous = super(ThreadStatsd, self).apply_config()
+        if previous is None:
+            return
+        if self.target != previous['target']:
+            print("Sending to statsd {0}:{1} from now on".format(*self.target))
+        for name in ('registry', 'last_sent', 'suppressed', 'collector_sent', 'metrics_received'):
+            setattr(self, name, previous[name])
 
     def get_sender(self, t):
-        if t == 'g':
+        if t in ['g', 'p']:
             return self.client.gauge
         elif t in ['r', 'd']:
             return self.client.update_stats
@@ -45,6 +198,51 @@ class ThreadStatsd(ThreadBase):
         elif t == 't':
             return self.client.timing
 
+    def send_batch(self, batch):
+        (timestamp, samples) = batch
+        tracked = []
+        change_only = []
+        for item in samples:
+            if self.debug:
+                print(item)
+            if item[1] is None:
+                continue
+            if item[2] in self.tracked_types:
+                tracked.append(item)
+            elif self.changes_only and item[2] in self.change_only_types:
+                change_only.append(item)
+            else:
+                self.send_stat(item)
+
+        if tracked:
+            self.send_tracked(tracked, timestamp)
+        if change_only:
+            self.send_changed(change_only, timestamp)
+
+    def send_tracked(self, items, timestamp):
+        """
+        Computes the deltas and rates of all items of a poll in one go.
+        Deltas are only sent when positive, rates are normalised by the time
+        elapsed since the previous poll. Nothing is sent for new keys.
+        """
+        deltas, rates = self.registry.update([k for k, v, t in items], [float(v) for k, v, t in items], timestamp)
+        for (k, v, t), delta, rate in zip(items, deltas, rates):
+            if t == 'd':
+                if delta > 0:
+                    self.get_sender(t)(k, delta)
+            elif rate >= 0:
+                self.get_sender(t)(k, rate)
+
+    def send_changed(self, items, timestamp):
+        """ Sends the items whose value changed or that are due for a heartbeat """
+        values = [float(v) for k, v, t in items]
+        changed = self.last_sent.changed([k for k, v, t in items], values, timestamp, self.heartbeat)
+        for (k, v, t), value, is_changed in zip(items, values, changed):
+            if is_changed:
+                self.get_sender(t)(k, value)
+            else:
+                self.suppressed += 1
+
     def send_stat(self, item):
         (k, v, t) = item
 
@@ -52,38 +250,98 @@ class ThreadStatsd(ThreadBase):
         if v == None:
             return False
 
-        if t == 'd':
-            delta = self.get_delta(k, v)
-            if delta > 0:
-                sender = self.get_sender(t)
-                sender(k, float(delta))
+        if t in self.tracked_types:
+            self.send_tracked([item], time.time())
         else:
             sender = self.get_sender(t)
             sender(k, float(v))
 
     def get_delta(self, k, v):
-        if k in self.data:
-            delta = float(v) - self.data[k]
-            self.data[k] = float(v)
-            return delta
-        else:
-            self.data[k] = float(v)
+        deltas, rates = self.registry.update([k], [float(v)], time.time())
+        # Keys seen for the first time have no delta yet
+        if deltas[0] != deltas[0]:
             return -1
+        return deltas[0]
+
+    def collector_samples(self):
+        """
+        The number of check results waiting in the queue at most since the
+        previous report, metrics dropped or coalesced because the queue was
+        full, metrics received and, when batching, packets sent and, in
+        changes_only mode, unchanged metrics that weren't sent
+        """
+        base = self.collector_prefix + '.sender.'
+        samples = [
+            (base + 'queue_depth', self.queue.reset_high_water(), 'g'),
+            (base + 'dropped', self.queue.dropped, 'd'),
+            (base + 'coalesced', self.queue.coalesced, 'd'),
+            (base + 'metrics', self.metrics_received, 'd'),
+        ]
+        if self.batch:
+            samples.append((base + 'packets', self.client.packets_sent, 'd'))
+        if self.changes_only:
+            samples.append((base + 'suppressed', self.suppressed, 'd'))
+        return samples
+
+    def report_collector(self, now):
+        if not self.collector_prefix or now - self.collector_sent < self.collector_interval:
+            return
+        self.collector_sent = now
+        self.send_batch((now, self.collector_samples()))
+
+    def get_timeout(self):
+        """
+        Wait until the batch has to be flushed or the collector metrics are
+        due, so these are sent when no metrics arrive as well. Without either
+        wait without a timeout, stop() wakes us up. This avoids the polling
+        Python 2 does while waiting with a timeout.
+        """
+        now = time.time()
+        timeouts = []
+        if self.batch and self.client.buffer:
+            timeouts.append(self.batch_delay - self.client.pending_for(now))
+        if self.collector_prefix:
+            timeouts.append(self.collector_sent + self.collector_interval - now)
+        if not timeouts:
+            return None
+        return max(0, min(timeouts))
+
+    def stop(self):
+        super(ThreadStatsd, self).stop()
+        # Wake up the sender in case it's waiting for metrics
+        self.queue.put((time.time(), []))
+
+    def flush(self, force=False):
+        if not self.batch:
+            return
+        if force or self.client.pending_for(time.time()) >= self.batch_delay:
+            self.client.flush()
 
     def run(self):
         while self.run:
+            if self.new_config is not None:
+                self.apply_config()
             try:
-                # Timeout after 1 second so we can respond to quit events
-                item = self.queue.get(True, 1)
-                if self.debug:
-                    print(item)
-                self.send_stat(item)
+                # Take everything that has been queued in one go
+                for batch in self.queue.get_all(True, self.get_timeout()):
+                    self.metrics_received += len(batch[1])
+                    self.send_batch(batch)
             except Queue.Empty:
-                continue
+                pass
+            self.report_collector(time.time())
+            self.flush()
+
+        self.flush(force=True)
+        if self.batch:
+            print(self.client.report())
 
 
 class ThreadFakeStatsd(ThreadStatsd):
     """Prints metrics instead of sending them to statsd."""
+    def send_batch(self, batch):
+        for item in batch[1]:
+            self.send_stat(item)
+
     def send_stat(self, item):
         print item
 
@@ -91,7 +349,7 @@ class ThreadFakeStatsd(ThreadStatsd):
 if __name__ == '__main__':
     # Run standalone to test this module, it will generate garbage
     from thread_manager import ThreadManager
-    q = Queue.Queue()
+    q = MetricQueue()
 
     threads = [ThreadGenerateGarbage(q), ThreadStatsd(q)]
     tm = ThreadManager(threads=threads)
@@ -0,0 +1,77 @@
+import re
+
+
+class MetricWhitelist(object):
+    """
+    The [metrics] section compiled into a lookup index.
+
+    Keys may contain * wildcards that match anything but a dot, e.g.
+    innodb.bufferpool_*.pool_size or tables.*.*.rows_read. Every key that is
+    looked up is cached per check type together with its full metric name and
+    type (or None when it isn't whitelisted), so once a key has been seen
+    filtering it costs a single dict lookup.
+    """
+    # Don't let unbounded key sets (f.e. per table metrics) grow the cache forever
+    max_cache_size = 100000
+
+    def __init__(self, metrics, prefix=''):
+        self.prefix = prefix
+        self.exact = {}
+        self.patterns = []
+        for key, metric_type in metrics.items():
+            key = key.lower()
+            if '*' in key:
+                regex = re.compile('[^.]*'.join(re.escape(part) for part in key.split('*')) + '$')
+                self.patterns.append((key, regex, metric_type))
+            else:
+                self.exact[key] = metric_type
+        # Most specific (longest) patterns first so they win over broader ones
+        self.patterns.sort(key=lambda pattern: (-len(pattern[0]), pattern[0]))
+        self.caches = {}
+
+    def names(self, check_type):
+        """
+        Returns the whitelisted keys of a check and its wildcard keys, the
+        latter with % instead of * so they can be used in a LIKE.
+        """
+        exact = sorted(key.split('.', 1)[1] for key in self.exact
+                       if key.startswith(check_type + '.'))
+        wildcards = []
+        for key, regex, metric_type in self.patterns:
+            namespace, sep, name = key.partition('.')
+            namespace_regex = '[^.]*'.join(re.escape(part) for part in namespace.split('*')) + '$'
+            if name and re.match(namespace_regex, check_type):
+                wildcards.append(name.replace('*', '%'))
+        return exact, sorted(wildcards)
+
+    def cache(self, check_type):
+        """Returns the dict of resolved keys of a check, see resolve for its values"""
+        cache = self.caches.get(check_type)
+        if cache is None or len(cache) > self.max_cache_size:
+            cache = self.caches[check_type] = {}
+        return cache
+
+    def resolve(self, check_type, key):
+        """
+        Returns (metric name, metric type) when the key of a check is
+        whitelisted and None if it isn't. The result is cached.
+        """
+        metric_key = check_type + "." + key.lower()
+        metric_type = self.exact.get(metric_key)
+        if metric_type is None:
+            for pattern, regex, pattern_type in self.patterns:
+                if regex.match(metric_key):
+                    metric_type = pattern_type
+                    break
+
+        entry = None
+        if metric_type is not None:
+            entry = (self.prefix + metric_key, metric_type)
+        self.cache(check_type)[key] = entry
+        return entry
+
+    def lookup(self, check_type, key):
+        try:
+            return self.caches[check_type][key]
+        except KeyError:
+            return self.resolve(check_type, key)
@@ -2,7 +2,9 @@
 # -*- coding: utf-8 -*-
 import unittest
 import os
-from mysql_statsd.preprocessors import InnoDBPreprocessor
+from mysql_statsd.preprocessors import (InnoDBPreprocessor, InnoDBTablePreprocessor,
+                                      InnoDBMetricsPreprocessor, InnoDBBufferPoolPreprocessor,
+                                      PagedTablePreprocessor, DigestPreprocessor)
 
 class InnoDBPreprocessorTest(unittest.TestCase):
     def test_values_read_from_vanilla_install(self):
@@ -58,5 +60,133 @@ class InnoDBPreprocessorTest(unittest.TestCase):
                 'unpurged_txns': 1282, }
         self.assertEquals(expected, dict(processed))
 
+
+class InnoDBTablePreprocessorTest(unittest.TestCase):
+    def test_same_output_as_innodb_preprocessor(self):
+        """
+        The table driven parser must produce exactly what the original
+        parser produces, including multiple buffer pools and transactions.
+        """
+        for fixture in ('show-innodb-status-5.5-vanilla', 'show-innodb-status-5.5-multi-pool'):
+            path = os.path.join(os.path.dirname(__file__), 'fixtures', fixture)
+            rows = [('InnoDB', '', open(path, 'rb').read())]
+
+            expected = dict(InnoDBPreprocessor().process(rows))
+            processor = InnoDBTablePreprocessor()
+            self.assertEquals(expected, dict(processor.process(rows)))
+            # Parsing twice must not accumulate state
+            self.assertEquals(expected, dict(processor.process(rows)))
+
+    def fixture_rows(self, fixture):
+        path = os.path.join(os.path.dirname(__file__), 'fixtures', fixture)
+        return [('InnoDB', '', open(path, 'rb').read())]
+
+    def test_only_sections_with_whitelisted_metrics_are_parsed(self):
+        rows = self.fixture_rows('show-innodb-status-5.5-multi-pool')
+        everything = dict(InnoDBTablePreprocessor().process(rows))
+
+        processed = dict(InnoDBTablePreprocessor(metrics=['rows_read', 'bufferpool_*.pool_size']).process(rows))
+        expected = dict((key, value) for key, value in everything.items()
+                        if key.startswith('rows_') or key == 'read_views' or key.startswith('bufferpool_'))
+        self.assertEquals(expected, processed)
+        self.assertTrue('bufferpool_1.pool_size' in processed)
+
+    def test_unchanged_sections_are_not_parsed_again(self):
+        rows = self.fixture_rows('show-innodb-status-5.5-multi-pool')
+        processor = InnoDBTablePreprocessor()
+        processor.process(rows)
+
+        parsed = []
+        parse_lines = processor.parse_lines
+        processor.parse_lines = lambda chunk, body: parsed.append(chunk) or parse_lines(chunk, body)
+        changed = [('InnoDB', '', rows[0][2].replace('inserted 0, updated 0', 'inserted 5, updated 0'))]
+        processed = dict(processor.process(changed))
+
+        self.assertEquals(['ROW OPERATIONS'], parsed)
+        self.assertEquals(dict(InnoDBPreprocessor().process(changed)), processed)
+
+    def test_lines_of_a_section_are_capped(self):
+        text = '\n'.join(['------------', 'TRANSACTIONS', '------------', 'Trx id counter 0 100'] +
+                         ['---TRANSACTION 0, ACTIVE 1 sec'] * 10 +
+                         ['--------', 'FILE I/O', '--------', 'Pending flushes (fsync) log: 0; buffer pool: 3'])
+        processor = InnoDBTablePreprocessor(max_section_lines=5)
+        processed = dict(processor.process([('InnoDB', '', text)]))
+        self.assertEquals(4, processed['current_transactions'])
+        self.assertEquals('3', processed['pending_buf_pool_flushes'])
+        self.assertEquals(6, processor.truncated)
+
+
+class InnoDBMetricsPreprocessorTest(unittest.TestCase):
+    def test_metrics_are_named_like_the_innodb_status_ones(self):
+        rows = (('trx_rseg_history_len', '12'), ('dml_reads', '4000'), ('adaptive_hash_searches', '7'))
+        processed = InnoDBMetricsPreprocessor().process(rows, ['NAME', 'COUNT'])
+        self.assertEquals([('history_list', '12'), ('rows_read', '4000'), ('adaptive_hash_searches', '7')],
+                          processed)
+
+    def test_buffer_pools_are_numbered(self):
+        columns = ['POOL_ID', 'POOL_SIZE', 'FREE_BUFFERS', 'PENDING_DECOMPRESS']
+        rows = ((0, 8191, 7000, 0), (1, 8192, 6000, 0))
+        processed = InnoDBBufferPoolPreprocessor().process(rows, columns)
+        self.assertEquals([('bufferpool_0.pool_size', 8191), ('bufferpool_0.free_pages', 7000),
+                           ('bufferpool_1.pool_size', 8192), ('bufferpool_1.free_pages', 6000)],
+                          processed)
+
+
+class PagedTablePreprocessorTest(unittest.TestCase):
+    columns = ['OBJECT_SCHEMA', 'OBJECT_NAME', 'COUNT_READ', 'COUNT_WRITE']
+
+    def test_pages_through_the_tables(self):
+        processor = PagedTablePreprocessor(page_size=2)
+        template = "SELECT * FROM t WHERE (OBJECT_SCHEMA, OBJECT_NAME) > ({0}, {1}) LIMIT {limit}"
+        self.assertEquals("SELECT * FROM t WHERE (OBJECT_SCHEMA, OBJECT_NAME) > ('', '') LIMIT 2",
+                          processor.query(template))
+        processor.process((('shop', 'orders', 10, 1), ('shop', 'users', 5, 0)), self.columns)
+        self.assertEquals("SELECT * FROM t WHERE (OBJECT_SCHEMA, OBJECT_NAME) > ('shop', 'users') LIMIT 2",
+                          processor.query(template))
+        processor.process((('shop', 'zips', 1, 0),), self.columns)
+        self.assertEquals(None, processor.after)
+
+    def test_only_changed_tables_busiest_first(self):
+        processor = PagedTablePreprocessor(max_keys=2)
+        processor.process((('shop', 'orders', 10, 1), ('shop', 'users', 5, 0), ('shop', 'zips', 1, 0)), self.columns)
+        processed = processor.process((('shop', 'orders', 12, 1), ('shop', 'users', 9, 2), ('shop', 'zips', 2, 0)),
+                                      self.columns)
+        self.assertEquals([('shop.users.count_read', 4), ('shop.users.count_write', 2)], processed)
+
+    def test_gauge_columns_are_sent_as_is(self):
+        processor = PagedTablePreprocessor()
+        columns = ['TABLE_SCHEMA', 'TABLE_NAME', 'TABLE_ROWS', 'DATA_LENGTH']
+        self.assertEquals([('shop.orders.table_rows', 10), ('shop.orders.data_length', 16384)],
+                          processor.process((('shop', 'orders', 10, 16384),), columns))
+        self.assertEquals([('shop.orders.table_rows', 8)],
+                          processor.process((('shop', 'orders', 8, 16384),), columns))
+
+    def test_dropped_tables_are_forgotten(self):
+        processor = PagedTablePreprocessor()
+        processor.process((('shop', 'orders', 10, 1), ('shop', 'users', 5, 0)), self.columns)
+        processor.process((('shop', 'orders', 10, 1),), self.columns)
+        self.assertEquals(['shop.orders'], processor.counters.keys())
+
+
+class DigestPreprocessorTest(unittest.TestCase):
+    columns = ['SCHEMA_NAME', 'DIGEST', 'COUNT_STAR', 'SUM_TIMER_WAIT']
+
+    def test_top_digests_and_other(self):
+        processor = DigestPreprocessor(top=1)
+        self.assertEquals([], processor.process((('shop', 'aa', 10, 5000000000), ('shop', 'bb', 100, 1000000000),
+                                                  ('shop', 'cc', 1, 1000000000)), self.columns))
+        processed = processor.process((('shop', 'aa', 12, 9000000000), ('shop', 'bb', 200, 3000000000),
+                                       ('shop', 'cc', 2, 2000000000), ('shop', 'dd', 1, 1000000000)), self.columns)
+        self.assertEquals([('shop.aa.count', 2), ('shop.aa.latency', 4), ('other.count', 101), ('other.latency', 3)],
+                          processed)
+
+    def test_order_by_count(self):
+        processor = DigestPreprocessor(top=1, order='count')
+        processor.process((('shop', 'aa', 10, 5000000000), ('shop', 'bb', 100, 1000000000)), self.columns)
+        processed = processor.process((('shop', 'aa', 12, 9000000000), ('shop', 'bb', 200, 3000000000)), self.columns)
+        self.assertEquals([('shop.bb.count', 100), ('shop.bb.latency', 2), ('other.count', 2), ('other.latency', 4)],
+                          processed)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.thread_statsd import BatchClient, ThreadStatsd
+
+
+class FakeSocket(object):
+    def __init__(self):
+        self.packets = []
+
+    def sendto(self, packet, addr):
+        self.packets.append(packet)
+
+
+class BatchClientTest(unittest.TestCase):
+    def client(self, mtu=1432):
+        client = BatchClient('localhost', 8125, prefix='mysql', mtu=mtu)
+        client.udp_sock = FakeSocket()
+        return client
+
+    def test_packs_lines_up_to_the_mtu(self):
+        client = self.client(mtu=40)
+        for i in range(5):
+            client.update_stats('status.com_select', i)
+        client.flush()
+        packets = client.udp_sock.packets
+        # Every line is 'mysql.status.com_select:<i>|c', 27 bytes, so one fits per packet of 40
+        self.assertEquals(5, len(packets))
+        self.assertEquals('mysql.status.com_select:0|c', packets[0])
+
+        client = self.client(mtu=60)
+        for i in range(5):
+            client.update_stats('status.com_select', i)
+        client.flush()
+        packets = client.udp_sock.packets
+        self.assertEquals('mysql.status.com_select:0|c\nmysql.status.com_select:1|c', packets[0])
+        self.assertEquals(3, len(packets))
+        self.assertTrue(all(len(packet) <= 60 for packet in packets))
+        self.assertEquals(5, client.metrics_sent)
+        self.assertEquals(3, client.packets_sent)
+        self.assertEquals(2, client.packets_saved())
+
+    def test_formats_lines_per_type(self):
+        statsd = ThreadStatsd(queue=MetricQueue(), batch='true', include_hostname='false', prefix='mysql')
+        statsd.client.udp_sock = FakeSocket()
+        statsd.send_batch((1, [('variables.max_connections', '151', 'g'), ('status.slow_queries', '2', 'r'),
+                               ('status.connections', '1', 'c'), ('collector.status.query_time', '1.5', 't')]))
+        statsd.flush(force=True)
+        self.assertEquals(['mysql.variables.max_connections:151.000000|g',
+                           'mysql.status.slow_queries:2.0|c',
+                           'mysql.status.connections:1|c',
+                           'mysql.collector.status.query_time:1.500000|ms'],
+                          statsd.client.udp_sock.packets[0].split('\n'))
+
+    def test_flushes_after_the_batch_delay(self):
+        statsd = ThreadStatsd(queue=MetricQueue(), batch='true', batch_delay='50', include_hostname='false')
+        statsd.client.udp_sock = FakeSocket()
+        statsd.send_batch((1, [('variables.max_connections', '151', 'g')]))
+        statsd.flush()
+        self.assertEquals([], statsd.client.udp_sock.packets)
+        self.assertTrue(0 < statsd.get_timeout() <= 0.05)
+
+        statsd.client.buffered_since -= 0.05
+        self.assertEquals(0, statsd.get_timeout())
+        statsd.flush()
+        self.assertEquals(1, len(statsd.client.udp_sock.packets))
+        self.assertEquals(0, statsd.client.pending_for(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
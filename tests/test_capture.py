@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from mysql_statsd.capture import CaptureReader, CaptureWriter
+
+
+class CaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'capture')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_records_are_replayed_in_order(self):
+        writer = CaptureWriter(self.path)
+        writer.write(1.5, 'mysql', 'status', ['Variable_name', 'Value'], (('Questions', '10'), ('Uptime', '5')))
+        writer.close()
+        # Appending to an existing capture doesn't repeat the magic
+        writer = CaptureWriter(self.path)
+        writer.write(2.5, 'mysql', 'slave', ['Seconds_Behind_Master'], ((None,),))
+        writer.close()
+
+        reader = CaptureReader(self.path)
+        self.assertEquals([
+            (1.5, 'mysql', 'status', ['Variable_name', 'Value'], (('Questions', '10'), ('Uptime', '5'))),
+            (2.5, 'mysql', 'slave', ['Seconds_Behind_Master'], ((None,),)),
+        ], list(reader))
+        reader.close()
+
+    def test_truncated_record_ends_the_capture(self):
+        writer = CaptureWriter(self.path)
+        writer.write(1.5, 'mysql', 'status', ['Variable_name', 'Value'], (('Questions', '10'),))
+        writer.write(2.5, 'mysql', 'status', ['Variable_name', 'Value'], (('Questions', '12'),))
+        writer.close()
+        with open(self.path, 'r+b') as capture:
+            capture.truncate(os.path.getsize(self.path) - 3)
+
+        reader = CaptureReader(self.path)
+        self.assertEquals([1.5], [record[0] for record in reader])
+        reader.close()
+
+    def test_other_files_are_refused(self):
+        with open(self.path, 'w') as other:
+            other.write('[mysql]\n')
+        self.assertRaises(ValueError, CaptureReader, self.path)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from mysql_statsd.check_scheduler import CheckScheduler
+
+
+class CheckSchedulerTest(unittest.TestCase):
+    def test_checks_are_aligned_to_their_interval(self):
+        scheduler = CheckScheduler()
+        scheduler.add('status', 1.0, now=100.3)
+        scheduler.add('innodb', 10.0, now=100.3)
+        self.assertEquals(101.0, scheduler.next_time())
+        self.assertEquals(None, scheduler.pop_due(100.9))
+        self.assertEquals(('status', 101.0), scheduler.pop_due(101.2))
+        self.assertEquals(0.2, round(scheduler.record('status', 101.0, 101.2), 6))
+
+    def test_missed_runs_are_skipped(self):
+        scheduler = CheckScheduler()
+        scheduler.add('status', 1.0, now=100.3)
+        check, due = scheduler.pop_due(101.0)
+        self.assertEquals(104.0, scheduler.reschedule(check, due, 103.5))
+        self.assertEquals(105.0, scheduler.reschedule(check, 104.0, 104.0))
+
+    def test_jitter_is_a_fixed_offset(self):
+        scheduler = CheckScheduler(jitter=0.5)
+        scheduler.add('status', 1.0, now=100.0)
+        offset = scheduler.offsets['status']
+        self.assertTrue(0 <= offset <= 0.5)
+        check, due = scheduler.pop_due(102.0)
+        self.assertAlmostEquals(offset, due % 1.0)
+        self.assertAlmostEquals(offset, scheduler.reschedule(check, due, due) % 1.0)
+
+
+    def test_reload_keeps_due_times_of_unchanged_checks(self):
+        previous = CheckScheduler()
+        previous.add('status', 1.0, now=100.3)
+        previous.add('innodb', 10.0, now=100.3)
+        previous.add('slave', 5.0, now=100.3)
+        check, due = previous.pop_due(101.0)
+        previous.reschedule(check, due, 101.0)
+
+        scheduler = CheckScheduler()
+        scheduler.add('status', 1.0, now=101.5)
+        scheduler.add('innodb', 20.0, now=101.5)
+        scheduler.add('variables', 60.0, now=101.5)
+        scheduler.keep(previous)
+        self.assertEquals(('status', 102.0), scheduler.pop_due(102.0))
+        self.assertEquals(None, scheduler.pop_due(119.0))
+        self.assertEquals(('innodb', 120.0), scheduler.pop_due(120.0))
+
+    def test_reload_leaves_out_running_checks(self):
+        previous = CheckScheduler()
+        previous.add('status', 1.0, now=100.3)
+        previous.pop_due(101.0)
+
+        scheduler = CheckScheduler()
+        scheduler.add('status', 1.0, now=101.2)
+        scheduler.keep(previous)
+        self.assertEquals(None, scheduler.next_time())
+        self.assertEquals(103.0, scheduler.reschedule('status', 101.0, 102.5))
+
+
+    def test_intervals_stretch_under_load_and_shrink_back(self):
+        scheduler = CheckScheduler(max_factor=4)
+        scheduler.add('innodb', 10.0, now=100.3)
+        check, due = scheduler.pop_due(110.0)
+        self.assertTrue(scheduler.stretch(check, True))
+        self.assertEquals(130.0, scheduler.reschedule(check, due, 110.5))
+        self.assertTrue(scheduler.stretch(check, True))
+        self.assertFalse(scheduler.stretch(check, True))
+        self.assertEquals(40.0, scheduler.interval(check))
+        self.assertEquals(170.0, scheduler.reschedule(check, 130.0, 130.5))
+        scheduler.stretch(check, False)
+        self.assertEquals(190.0, scheduler.reschedule(check, 170.0, 170.5))
+
+    def test_deferred_checks_keep_their_due_time(self):
+        scheduler = CheckScheduler()
+        scheduler.add('innodb', 10.0, now=100.3)
+        check, due = scheduler.pop_due(110.0)
+        scheduler.defer(check, due, 110.5)
+        self.assertEquals(None, scheduler.pop_due(110.4))
+        self.assertEquals(('innodb', 110.0), scheduler.pop_due(110.5))
+        self.assertEquals(0.5, scheduler.record('innodb', 110.0, 110.5))
+
+if __name__ == '__main__':
+    unittest.main()
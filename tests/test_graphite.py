@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import cPickle as pickle
+import socket
+import struct
+import unittest
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.thread_graphite import ThreadGraphite
+
+
+class BrokenSocket(object):
+    closed = False
+
+    def sendall(self, data):
+        raise socket.error(32, 'Broken pipe')
+
+    def close(self):
+        self.closed = True
+
+
+class ThreadGraphiteTest(unittest.TestCase):
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.server.settimeout(5)
+
+    def tearDown(self):
+        self.server.close()
+
+    def sender(self, **config):
+        config.setdefault('include_hostname', 'false')
+        return ThreadGraphite(queue=MetricQueue(), host='127.0.0.1', port=self.server.getsockname()[1], **config)
+
+    def receive(self):
+        conn, addr = self.server.accept()
+        conn.settimeout(5)
+        data = conn.recv(1024)
+        conn.close()
+        return data
+
+    def test_samples_keep_their_timestamp(self):
+        sender = self.sender()
+        self.assertEquals([('mysql.status.threads_running', 3.0, 100)], sender.get_samples(
+            (100, [('status.questions', '10', 'd'), ('status.uptime', '5', 'p'), ('status.threads_running', '3', 'g'),
+                   ('status.innodb_version', 'x', 'g'), ('slave.seconds_behind_master', None, 'g')])))
+        self.assertEquals([('mysql.status.questions', 20.0, 110), ('mysql.status.uptime', 2.0, 110)],
+                          sender.get_samples((110, [('status.questions', '30', 'd'), ('status.uptime', '25', 'p')])))
+        # After a server restart
+        self.assertEquals([], sender.get_samples((120, [('status.questions', '5', 'd')])))
+
+    def test_encodes_plaintext_and_pickle(self):
+        samples = [('mysql.status.threads_running', 3.0, 100), ('mysql.status.questions', 20.5, 110)]
+        self.assertEquals('mysql.status.threads_running 3.0 100\nmysql.status.questions 20.5 110\n',
+                          self.sender().encode(samples))
+
+        data = self.sender(protocol='pickle').encode(samples)
+        self.assertEquals(len(data) - 4, struct.unpack('!L', data[:4])[0])
+        self.assertEquals([('mysql.status.threads_running', (100, 3.0)), ('mysql.status.questions', (110, 20.5))],
+                          pickle.loads(data[4:]))
+
+    def test_retries_after_the_reconnect_delay(self):
+        sender = self.sender(reconnect_delay='60000')
+        sender.pending.append('mysql.status.questions 10.0 100\n')
+        sender.send_pending()
+        self.assertEquals('mysql.status.questions 10.0 100\n', self.receive())
+
+        broken = sender.sock = BrokenSocket()
+        sender.pending.append('mysql.status.questions 20.0 110\n')
+        sender.send_pending()
+        self.assertTrue(broken.closed)
+        self.assertEquals(None, sender.sock)
+        sender.send_pending()
+        self.assertEquals(None, sender.sock)
+        self.assertEquals(1, len(sender.pending))
+
+        sender.reconnect_at -= 60
+        sender.send_pending()
+        self.assertEquals('mysql.status.questions 20.0 110\n', self.receive())
+        self.assertEquals(0, len(sender.pending))
+        sender.sock.close()
+
+    def test_keeps_the_latest_sends_while_unreachable(self):
+        sender = self.sender(max_pending='2')
+        self.server.close()
+        for timestamp in (100, 110, 120):
+            sender.pending.append(sender.encode([('mysql.status.questions', 10.0, timestamp)]))
+            sender.send_pending()
+        self.assertEquals(None, sender.sock)
+        self.assertEquals(['mysql.status.questions 10.0 110\n', 'mysql.status.questions 10.0 120\n'],
+                          list(sender.pending))
+
+
+if __name__ == '__main__':
+    unittest.main()
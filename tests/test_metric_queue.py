@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from mysql_statsd.metric_queue import MetricQueue
+
+
+class MetricQueueTest(unittest.TestCase):
+    def fill(self, queue):
+        queue.put((1, [('status.questions', 1, 'd'), ('status.open_files', 5, 'g')]))
+        queue.put((2, [('status.questions', 2, 'd')]))
+        queue.put((3, [('status.questions', 3, 'd'), ('status.threads_running', 4, 'g')]))
+
+    def test_drop_oldest(self):
+        queue = MetricQueue(max_size=2)
+        self.fill(queue)
+        self.assertEquals([2, 3], [timestamp for timestamp, samples in queue.get_all()])
+        self.assertEquals(2, queue.dropped)
+        self.assertEquals(2, queue.reset_high_water())
+
+    def test_drop_newest(self):
+        queue = MetricQueue(max_size=2, policy='drop_newest')
+        self.fill(queue)
+        self.assertEquals([1, 2], [timestamp for timestamp, samples in queue.get_all()])
+        self.assertEquals(2, queue.dropped)
+
+    def test_coalesce_keeps_the_latest_values(self):
+        queue = MetricQueue(max_size=2, policy='coalesce')
+        self.fill(queue)
+        items = queue.get_all()
+        self.assertEquals(1, len(items))
+        self.assertEquals(3, items[0][0])
+        self.assertEquals(sorted([('status.questions', 3, 'd'), ('status.open_files', 5, 'g'),
+                                  ('status.threads_running', 4, 'g')]), sorted(items[0][1]))
+        self.assertEquals(2, queue.coalesced)
+
+    def test_coalesce_sums_counters_and_keeps_timers(self):
+        queue = MetricQueue(max_size=1, policy='coalesce')
+        queue.put((1, [('digests.other.count', '2', 'r'), ('collector.status.query_time', 1.5, 't')]))
+        queue.put((2, [('digests.other.count', '3', 'r'), ('collector.status.query_time', 2.5, 't')]))
+        timestamp, samples = queue.get_all()[0]
+        self.assertEquals(sorted([('digests.other.count', 5.0, 'r'), ('collector.status.query_time', 1.5, 't'),
+                                  ('collector.status.query_time', 2.5, 't')]), sorted(samples))
+        self.assertEquals(1, queue.coalesced)
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, MetricQueue, policy='drop_all')
+
+
+if __name__ == '__main__':
+    unittest.main()
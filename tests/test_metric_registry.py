@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import math
+import unittest
+from mysql_statsd.metric_registry import MetricRegistry
+
+
+class MetricRegistryTest(unittest.TestCase):
+    def test_first_values_have_no_delta(self):
+        registry = MetricRegistry()
+        deltas, rates = registry.update(['com_select', 'com_insert'], [10.0, 20.0], 100.0)
+        self.assertTrue(all(math.isnan(value) for value in deltas + rates))
+
+    def test_deltas_and_rates(self):
+        registry = MetricRegistry()
+        registry.update(['com_select', 'com_insert'], [10.0, 20.0], 100.0)
+        deltas, rates = registry.update(['com_insert', 'com_select', 'com_update'], [20.0, 30.0, 5.0], 102.0)
+        self.assertEquals([0.0, 20.0], deltas[:2])
+        self.assertEquals([0.0, 10.0], rates[:2])
+        self.assertTrue(math.isnan(deltas[2]))
+
+    def test_grows_beyond_capacity(self):
+        registry = MetricRegistry(capacity=2)
+        keys = ['key%d' % i for i in range(10)]
+        registry.update(keys, [float(i) for i in range(10)], 1.0)
+        deltas, rates = registry.update(keys, [float(i * 2) for i in range(10)], 2.0)
+        self.assertEquals([float(i) for i in range(10)], deltas)
+        self.assertEquals(16, registry.capacity)
+
+    def test_changed_values_and_heartbeat(self):
+        registry = MetricRegistry()
+        self.assertEquals([True, True], registry.changed(['pool_size', 'open_files'], [10.0, 5.0], 100.0, 60))
+        self.assertEquals([False, True], registry.changed(['pool_size', 'open_files'], [10.0, 6.0], 130.0, 60))
+        self.assertEquals([True, False], registry.changed(['pool_size', 'open_files'], [10.0, 6.0], 160.0, 60))
+
+
+if __name__ == '__main__':
+    unittest.main()
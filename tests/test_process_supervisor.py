@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import signal
+import sys
+import time
+import unittest
+from mysql_statsd.process_supervisor import ProcessSupervisor
+
+
+def worker(index, shard):
+    if shard == 'crashing':
+        sys.exit(1)
+    time.sleep(30)
+
+
+class ProcessSupervisorTest(unittest.TestCase):
+    def start_supervisor(self, shards):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                supervisor = ProcessSupervisor(shards, worker)
+                supervisor.restart_delay = 10
+                supervisor.poll_interval = 0.05
+                supervisor.run()
+                code = 0
+            finally:
+                os._exit(code)
+        return pid
+
+    def wait_for_exit(self, pid, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            exited, status = os.waitpid(pid, os.WNOHANG)
+            if exited:
+                return status
+            time.sleep(0.05)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        return None
+
+    def test_quits_while_a_restart_is_pending(self):
+        pid = self.start_supervisor(['crashing', 'healthy'])
+        # The crashed worker is waiting out its restart delay
+        time.sleep(0.5)
+        os.kill(pid, signal.SIGTERM)
+        self.assertEquals(0, self.wait_for_exit(pid, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
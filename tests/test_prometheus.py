@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.thread_prometheus import ThreadPrometheus
+
+
+class ThreadPrometheusTest(unittest.TestCase):
+    def test_renders_the_latest_values(self):
+        exporter = ThreadPrometheus(queue=MetricQueue())
+        exporter.update((1, [('status.com_select', '10', 'd'), ('variables.max_connections', '151', 'g')]))
+        exporter.update((2, [('status.com_select', '12', 'd'), ('innodb.empty', '', 'g'),
+                             ('shard1.innodb.bufferpool_0.pool_size', None, 'g')]))
+        exporter.render()
+        self.assertEquals(sorted([
+            '# TYPE mysql_status_com_select counter',
+            'mysql_status_com_select 12.0',
+            '# TYPE mysql_variables_max_connections gauge',
+            'mysql_variables_max_connections 151.0',
+        ]), sorted(exporter.exposition.splitlines()))
+
+    def test_instances_are_labels(self):
+        exporter = ThreadPrometheus(queue=MetricQueue(), instances=[('shard1', 'shard1'), ('shards.shard2', 'shard2')])
+        exporter.update((1, [('shard1.status.com_select', '10', 'd'), ('shards.shard2.status.com_select', '12', 'd'),
+                             ('status.com_select', '1', 'd')]))
+        exporter.update((2, [('status.com.select', '2', 'd')]))
+        exporter.render()
+        self.assertEquals([
+            '# TYPE mysql_status_com_select counter',
+            'mysql_status_com_select 2.0',
+            'mysql_status_com_select{instance="shard1"} 10.0',
+            'mysql_status_com_select{instance="shard2"} 12.0',
+        ], exporter.exposition.splitlines())
+
+    def test_metrics_not_updated_expire(self):
+        exporter = ThreadPrometheus(queue=MetricQueue(), max_age='60000')
+        exporter.update((1, [('tables.db.gone.count_fetch', '10', 'r'), ('tables.db.busy.count_fetch', '5', 'r')]))
+        family, metric_type, series, value, updated = exporter.samples['tables.db.gone.count_fetch']
+        exporter.samples['tables.db.gone.count_fetch'] = (family, metric_type, series, value, updated - 61)
+        exporter.render()
+        self.assertEquals(['# TYPE mysql_tables_db_busy_count_fetch untyped', 'mysql_tables_db_busy_count_fetch 5.0'],
+                          exporter.exposition.splitlines())
+        self.assertEquals(['tables.db.busy.count_fetch'], exporter.rendered_keys.keys())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.thread_graphite import ThreadGraphite
+from mysql_statsd.thread_mysql import ThreadMySQL
+from mysql_statsd.thread_mysql_evented import ThreadMySQLEvented
+from mysql_statsd.thread_mysql_pool import ThreadMySQLPool
+from mysql_statsd.thread_statsd import ThreadStatsd
+
+
+class FakeConnection(object):
+    open = True
+
+    def close(self):
+        self.open = False
+
+
+def instance(name='mysql', **settings):
+    mysql = {
+        'name': name,
+        'stats_types': 'status,innodb',
+        'query_status': 'SHOW GLOBAL STATUS',
+        'interval_status': '1000',
+        'query_innodb': 'SHOW ENGINE INNODB STATUS',
+        'interval_innodb': '10000',
+    }
+    mysql.update(settings)
+    return dict(mysql=mysql, metrics={'status.questions': 'd'})
+
+
+class ThreadMySQLReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.poller = ThreadMySQL(queue=MetricQueue(), **instance())
+        self.connection = self.poller.connection = FakeConnection()
+
+    def test_keeps_the_connection(self):
+        self.poller.reconfigure(instance(interval_innodb='20000'))
+        self.poller.apply_config()
+        self.assertTrue(self.poller.connection is self.connection)
+        self.assertTrue(self.connection.open)
+        self.assertEquals(20.0, self.poller.scheduler.intervals['innodb'])
+
+    def test_reconnects_when_connection_settings_change(self):
+        self.poller.reconfigure(instance(host='db2'))
+        self.poller.apply_config()
+        self.assertEquals('db2', self.poller.host)
+        self.assertFalse(self.connection.open)
+        self.assertEquals(None, self.poller.connection)
+
+    def test_keeps_the_previous_config_when_invalid(self):
+        scheduler = self.poller.scheduler
+        self.poller.reconfigure(instance(interval_innodb='often', host='db2'))
+        self.poller.apply_config()
+        self.assertEquals('localhost', self.poller.host)
+        self.assertTrue(self.poller.scheduler is scheduler)
+        self.assertTrue(self.connection.open)
+
+
+class ThreadMySQLPoolReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = ThreadMySQLPool(queue=MetricQueue(), instances=[instance('a'), instance('b')], pool_size=1)
+        self.a, self.b = self.pool.instances
+
+    def test_adds_and_removes_instances(self):
+        self.pool.reconfigure(dict(instances=[instance('a', interval_status='2000'), instance('c')], pool_size=1))
+        self.pool.apply_config()
+        self.assertEquals(['a', 'c'], [poller.name for poller in self.pool.instances])
+        self.assertTrue(self.pool.instances[0] is self.a)
+        self.assertTrue(self.a.new_config is not None)
+        self.assertEquals([self.b], self.pool.retired)
+
+    def test_keeps_the_previous_config_when_invalid(self):
+        for config in (dict(instances=[instance('a'), instance('c')], pool_size='four'),
+                       dict(instances=[instance('a', interval_status='often'), instance('c')], pool_size=1)):
+            self.pool.reconfigure(config)
+            self.pool.apply_config()
+            self.assertEquals([self.a, self.b], self.pool.instances)
+            self.assertEquals(None, self.a.new_config)
+            self.assertEquals(1, self.pool.pool_size)
+
+
+class ThreadMySQLEventedReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = ThreadMySQLEvented(queue=MetricQueue(), instances=[instance('a'), instance('b')], pool_size=1)
+        self.checks = list(self.engine.checks)
+
+    def test_adds_and_removes_checks(self):
+        self.engine.apply_config(dict(instances=[instance('a', stats_types='status'), instance('c')]))
+        self.assertEquals([('a', 'status'), ('c', 'status'), ('c', 'innodb')],
+                          [(poller.name, check_type) for poller, check_type in self.engine.checks])
+        self.assertTrue(self.engine.checks[0][0] is self.checks[0][0])
+
+    def test_keeps_the_previous_config_when_invalid(self):
+        self.engine.apply_config(dict(instances=[instance('a'), instance('c', stats_types=None)]))
+        self.assertEquals(self.checks, self.engine.checks)
+        self.assertEquals(None, self.checks[0][0].new_config)
+
+
+class FakeSocket(object):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class SenderReloadTest(unittest.TestCase):
+    def test_statsd_keeps_the_registry_when_the_target_changes(self):
+        sender = ThreadStatsd(queue=MetricQueue(), include_hostname='false')
+        client, registry = sender.client, sender.registry
+        registry.update(['status.questions'], [10.0], 1)
+
+        sender.reconfigure(dict(include_hostname='false', heartbeat='30000'))
+        sender.apply_config()
+        self.assertTrue(sender.client is client)
+
+        sender.reconfigure(dict(include_hostname='false', port='8126'))
+        sender.apply_config()
+        self.assertFalse(sender.client is client)
+        self.assertEquals(('localhost', 8126), sender.target[:2])
+        self.assertTrue(sender.registry is registry)
+
+    def test_graphite_only_reconnects_when_carbon_moved(self):
+        sender = ThreadGraphite(queue=MetricQueue(), include_hostname='false')
+        sock = sender.sock = FakeSocket()
+
+        sender.reconfigure(dict(include_hostname='false', max_pending='10'))
+        sender.apply_config()
+        self.assertTrue(sender.sock is sock)
+
+        sender.reconfigure(dict(include_hostname='false', host='carbon2'))
+        sender.apply_config()
+        self.assertTrue(sock.closed)
+        self.assertEquals(None, sender.sock)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from mysql_statsd.capture import CaptureWriter
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.thread_graphite import ThreadGraphite
+from mysql_statsd.thread_replay import ThreadReplay
+from mysql_statsd.thread_statsd import ThreadStatsd
+
+
+class CountingStatsd(ThreadStatsd):
+    def send_batch(self, batch):
+        if batch[0] < 1000:
+            self.received.add(batch[0])
+
+
+class SlowGraphite(ThreadGraphite):
+    def get_samples(self, batch):
+        time.sleep(0.001)
+        if batch[0] < 1000:
+            self.received.add(batch[0])
+        return []
+
+    def send_pending(self):
+        pass
+
+
+class ThreadReplayTest(unittest.TestCase):
+    records = 200
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'capture')
+        writer = CaptureWriter(self.path)
+        for i in range(self.records):
+            writer.write(float(i), 'mysql', 'status', ['Variable_name', 'Value'], (('Questions', str(i)),))
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_senders_get_every_result(self):
+        queue = MetricQueue(max_size=10)
+        graphite_queue = MetricQueue(max_size=10)
+        queue.tee(graphite_queue)
+        mysql = dict(name='mysql', stats_types='status', query_status='SHOW GLOBAL STATUS', interval_status='1000')
+        replay = ThreadReplay(queue=queue, path=self.path,
+                              instances=[dict(mysql=mysql, metrics={'status.questions': 'd'})])
+        statsd = CountingStatsd(queue=queue, include_hostname='false')
+        graphite = SlowGraphite(queue=graphite_queue, include_hostname='false')
+        statsd.received = set()
+        graphite.received = set()
+        for thread in (statsd, graphite, replay):
+            thread.start()
+
+        # The thread manager stops the senders as soon as the replay finished
+        replay.join(10)
+        self.assertTrue(replay.finished)
+        for thread in (statsd, graphite):
+            thread.stop()
+            thread.join(10)
+        self.assertEquals(self.records, replay.replayed)
+        self.assertEquals(set(range(self.records)), statsd.received)
+        self.assertEquals(set(range(self.records)), graphite.received)
+        self.assertEquals(0, queue.dropped + graphite_queue.dropped)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import unittest
+import MySQLdb as mdb
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.metric_registry import MetricRegistry
+from mysql_statsd.thread_mysql import ThreadMySQL, ThreadMySQLMaxReconnectException
+from mysql_statsd.thread_mysql_evented import ThreadMySQLEvented
+
+
+def poller(**settings):
+    mysql = {
+        'stats_types': 'status,innodb',
+        'query_status': 'SHOW GLOBAL STATUS',
+        'interval_status': '1000',
+        'query_innodb': 'SHOW ENGINE INNODB STATUS',
+        'interval_innodb': '10000',
+    }
+    mysql.update(settings)
+    return ThreadMySQL(queue=MetricQueue(), mysql=mysql, metrics={'status.threads_running': 'g'})
+
+
+class FakeConnection(object):
+    open = True
+
+    def close(self):
+        self.open = False
+
+
+class ThreadMySQLReconnectTest(unittest.TestCase):
+    def test_backs_off_before_giving_up(self):
+        mysql = poller(max_reconnect='2', reconnect_delay='2000')
+
+        def connect():
+            raise Exception("Can't connect")
+        mysql.connect = connect
+
+        self.assertEquals(None, mysql.setup_connection())
+        self.assertTrue(mysql.reconnect_at > time.time())
+        self.assertFalse(mysql.ensure_connection())
+
+        mysql.reconnect_at = 0
+        self.assertRaises(ThreadMySQLMaxReconnectException, mysql.ensure_connection)
+        # Engines that keep polling other instances don't retry right away
+        self.assertTrue(mysql.reconnect_at > time.time())
+        self.assertFalse(mysql.ensure_connection())
+
+    def test_first_reconnect_after_a_lost_connection_is_jittered(self):
+        mysql = poller(reconnect_delay='2000')
+        mysql.connection = FakeConnection()
+        started = time.time()
+        try:
+            raise mdb.OperationalError(2013, 'Lost connection to MySQL server during query')
+        except mdb.OperationalError as ex:
+            mysql.recover_errors(ex)
+        self.assertFalse(mysql.connection.open)
+        self.assertTrue(started <= mysql.reconnect_at <= time.time() + 2)
+
+
+class ThreadMySQLCollectorTest(unittest.TestCase):
+    def test_pollers_of_an_instance_share_their_totals(self):
+        mysql = dict(name='db1', stats_types='status,innodb', query_status='SHOW GLOBAL STATUS',
+                     interval_status='1000', query_innodb='SHOW ENGINE INNODB STATUS', interval_innodb='10000')
+        engine = ThreadMySQLEvented(queue=MetricQueue(), instances=[dict(mysql=mysql, metrics={})], pool_size=1)
+        (status, _), (innodb, _) = engine.checks
+
+        def connect():
+            raise Exception("Can't connect")
+        for poller in (status, innodb):
+            poller.connect = connect
+            poller.setup_connection()
+
+        registry = MetricRegistry()
+        deltas = []
+        for poller, check_type in engine.checks * 2:
+            samples = [sample for sample in poller.collector_samples(check_type, 0, 0, 0)
+                       if sample[0].endswith('.reconnects')]
+            self.assertEquals([('collector.reconnects', 2, 'd')], samples)
+            deltas.append(registry.update([samples[0][0]], [samples[0][1]], time.time())[0][0])
+        # Interleaved, the totals of the pollers don't make up deltas
+        self.assertEquals([0.0, 0.0, 0.0], deltas[1:])
+
+
+class ThreadMySQLAdaptiveTest(unittest.TestCase):
+    def test_parse_thresholds(self):
+        thresholds, keys = ThreadMySQL.parse_thresholds('status.Threads_running:50, innodb.history_list:1000000')
+        self.assertEquals({'status.threads_running': 50.0, 'innodb.history_list': 1000000.0}, thresholds)
+        self.assertEquals({'status': {'threads_running': 'status.threads_running'},
+                           'innodb': {'history_list': 'innodb.history_list'}}, keys)
+        self.assertEquals(({}, {}), ThreadMySQL.parse_thresholds(''))
+        for invalid in ('threads_running:50', 'status.threads_running', 'status.threads_running:many'):
+            self.assertRaises(ValueError, ThreadMySQL.parse_thresholds, invalid)
+
+    def test_gauges_with_a_threshold_are_queried(self):
+        mysql = poller(adaptive_thresholds='status.threads_connected:500')
+        self.assertEquals("SHOW GLOBAL STATUS WHERE Variable_name IN ('threads_connected', 'threads_running')",
+                          mysql.stats_checks['status']['query'])
+
+    def test_intervals_stretch_while_overloaded(self):
+        mysql = poller(adaptive_checks='innodb', adaptive_query_time='100',
+                       adaptive_thresholds='status.threads_running:50', adaptive_max_factor='4')
+        mysql.query_time['innodb'] = 0.5
+        mysql.adapt_interval('innodb')
+        self.assertEquals(20.0, mysql.scheduler.interval('innodb'))
+
+        mysql.query_time['innodb'] = 0.01
+        mysql.process_result('status', ['Variable_name', 'Value'], [('Threads_running', '80')])
+        mysql.adapt_interval('innodb')
+        mysql.adapt_interval('innodb')
+        self.assertEquals(40.0, mysql.scheduler.interval('innodb'))
+        # Only the listed checks are adaptive
+        mysql.adapt_interval('status')
+        self.assertEquals(1.0, mysql.scheduler.interval('status'))
+
+        # The gauge wasn't returned anymore, its value expired
+        mysql.load['status.threads_running'] = (80.0, time.time() - 1)
+        mysql.adapt_interval('innodb')
+        self.assertEquals(20.0, mysql.scheduler.interval('innodb'))
+
+    def test_only_low_priority_checks_are_deferred_over_budget(self):
+        mysql = poller(cycle_budget='100', low_priority='innodb')
+        self.assertFalse(mysql.over_budget('innodb', 10.0, 10.0, 10.05))
+        self.assertTrue(mysql.over_budget('innodb', 10.0, 10.0, 10.2))
+        self.assertFalse(mysql.over_budget('status', 10.0, 10.0, 10.2))
+        # Deferred for a whole interval already
+        self.assertFalse(mysql.over_budget('innodb', 0.0, 10.0, 10.2))
+        self.assertFalse(poller(low_priority='innodb').over_budget('innodb', 10.0, 10.0, 10.2))
+
+
+if __name__ == '__main__':
+    unittest.main()
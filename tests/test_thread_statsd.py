@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from mysql_statsd.metric_queue import MetricQueue
+from mysql_statsd.thread_statsd import ThreadStatsd
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.sent = []
+
+    def gauge(self, stat, value):
+        self.sent.append((stat, value, 'g'))
+
+    def update_stats(self, stat, value):
+        self.sent.append((stat, value, 'c'))
+
+
+class ThreadStatsdTest(unittest.TestCase):
+    def sender(self, **config):
+        sender = ThreadStatsd(queue=MetricQueue(), include_hostname='false', **config)
+        sender.client = FakeClient()
+        return sender
+
+    def test_wakes_up_for_the_collector_metrics(self):
+        sender = self.sender(collector_interval='10000')
+        self.assertTrue(9 < sender.get_timeout() <= 10)
+        sender.collector_sent -= 10
+        self.assertEquals(0, sender.get_timeout())
+
+        # An idle sender still reports, f.e. the queue depth
+        sender.report_collector(sender.collector_sent + 10)
+        self.assertTrue(('collector.sender.queue_depth', 0, 'g') in sender.client.sent)
+
+        self.assertEquals(None, self.sender(collector_prefix='').get_timeout())
+
+    def test_changes_only_suppresses_unchanged_gauges(self):
+        sender = self.sender(changes_only='true')
+        for timestamp in (1, 2):
+            sender.send_batch((timestamp, [('variables.max_connections', '151', 'g'),
+                                           ('digests.other.count', '3', 'r')]))
+        self.assertEquals([('digests.other.count', 3.0, 'c'), ('variables.max_connections', 151.0, 'g'),
+                           ('digests.other.count', 3.0, 'c')], sender.client.sent)
+        self.assertEquals(1, sender.suppressed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from mysql_statsd.whitelist import MetricWhitelist
+
+
+class MetricWhitelistTest(unittest.TestCase):
+    metrics = {
+        'status.com_select': 'd',
+        'innodb.bufferpool_*.pool_size': 'g',
+        'tables.*.*.rows_read': 'r',
+        'tables.app.*.rows_read': 'd',
+    }
+
+    def test_exact_keys_are_matched_case_insensitive(self):
+        whitelist = MetricWhitelist(self.metrics)
+        self.assertEquals(('status.com_select', 'd'), whitelist.lookup('status', 'Com_select'))
+        self.assertEquals(None, whitelist.lookup('status', 'Com_insert'))
+        self.assertEquals(None, whitelist.lookup('variables', 'com_select'))
+
+    def test_wildcards_match_a_single_component(self):
+        whitelist = MetricWhitelist(self.metrics)
+        self.assertEquals(('innodb.bufferpool_12.pool_size', 'g'),
+                          whitelist.lookup('innodb', 'bufferpool_12.pool_size'))
+        self.assertEquals(('tables.shop.orders.rows_read', 'r'),
+                          whitelist.lookup('tables', 'shop.orders.rows_read'))
+        self.assertEquals(None, whitelist.lookup('tables', 'shop.rows_read'))
+        self.assertEquals(None, whitelist.lookup('innodb', 'bufferpool_1.pool_size_bytes'))
+
+    def test_most_specific_pattern_wins(self):
+        whitelist = MetricWhitelist(self.metrics)
+        self.assertEquals(('tables.app.users.rows_read', 'd'),
+                          whitelist.lookup('tables', 'app.users.rows_read'))
+
+    def test_resolved_keys_are_cached_with_prefix(self):
+        whitelist = MetricWhitelist(self.metrics, prefix='shard1.')
+        self.assertEquals(('shard1.status.com_select', 'd'), whitelist.lookup('status', 'Com_select'))
+        whitelist.lookup('status', 'Uptime')
+        self.assertEquals({'Com_select': ('shard1.status.com_select', 'd'), 'Uptime': None},
+                          whitelist.cache('status'))
+
+    def test_names_of_a_check(self):
+        whitelist = MetricWhitelist(dict(self.metrics, **{'status.innodb_*': 'g'}))
+        self.assertEquals((['com_select'], ['innodb_%']), whitelist.names('status'))
+        self.assertEquals(([], ['%.%.rows_read', 'app.%.rows_read']), whitelist.names('tables'))
+        self.assertEquals(([], []), whitelist.names('variables'))
+
+if __name__ == "__main__":
+    unittest.main()